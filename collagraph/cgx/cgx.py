@@ -1,9 +1,15 @@
 import ast
-from html.parser import HTMLParser
+import builtins
+from contextlib import contextmanager
+import hashlib
+import html
+import importlib.util
+import marshal
+import os
 from pathlib import Path
 import re
 import sys
-import textwrap
+import warnings
 
 from collagraph import Component
 
@@ -12,19 +18,80 @@ from collagraph import Component
 # Defaults to True, except when it is part of an installed application
 CGX_RUNTIME_WARNINGS = not getattr(sys, "frozen", False)
 
+# Directory in which the compiled code of loaded CGX files is cached.
+# Set to None to disable the cache on disk.
+CGX_CACHE_DIR = (
+    Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "collagraph"
+)
+# Bump this version whenever the generated code changes, so that
+# code that is cached on disk will be invalidated
+CGX_CODEGEN_VERSION = 13
+
 SUFFIX = "cgx"
+# The directives are interned, just like the tags and attribute names
+# that are parsed from CGX files, so that comparing them is cheap
 DIRECTIVE_PREFIX = "v-"
-DIRECTIVE_BIND = f"{DIRECTIVE_PREFIX}bind"
-DIRECTIVE_IF = f"{DIRECTIVE_PREFIX}if"
-DIRECTIVE_ELSE_IF = f"{DIRECTIVE_PREFIX}else-if"
-DIRECTIVE_ELSE = f"{DIRECTIVE_PREFIX}else"
+DIRECTIVE_BIND = sys.intern(f"{DIRECTIVE_PREFIX}bind")
+DIRECTIVE_IF = sys.intern(f"{DIRECTIVE_PREFIX}if")
+DIRECTIVE_ELSE_IF = sys.intern(f"{DIRECTIVE_PREFIX}else-if")
+DIRECTIVE_ELSE = sys.intern(f"{DIRECTIVE_PREFIX}else")
 CONTROL_FLOW_DIRECTIVES = (DIRECTIVE_IF, DIRECTIVE_ELSE_IF, DIRECTIVE_ELSE)
-DIRECTIVE_FOR = f"{DIRECTIVE_PREFIX}for"
-DIRECTIVE_ON = f"{DIRECTIVE_PREFIX}on"
+DIRECTIVE_FOR = sys.intern(f"{DIRECTIVE_PREFIX}for")
+DIRECTIVE_ON = sys.intern(f"{DIRECTIVE_PREFIX}on")
 AST_GEN_VARIABLE_PREFIX = "_ast_"
-
-COMPONENT_CLASS_DEFINITION = re.compile(r"class\s*(.*?)\s*\(.*?\)\s*:")
+LOOKUP_NAME = f"{AST_GEN_VARIABLE_PREFIX}lookup"
+GLOBALS_NAME = f"{AST_GEN_VARIABLE_PREFIX}globals"
+# Name under which create_element is imported in the component class body
+# (mangled with the name of the class), for creating the static elements
+CLASS_CREATE_ELEMENT_NAME = f"_{AST_GEN_VARIABLE_PREFIX}create_element"
+CLASS_FREEZE_ELEMENT_NAME = f"_{AST_GEN_VARIABLE_PREFIX}freeze_element"
+HOST_ELEMENT_NAME = f"{AST_GEN_VARIABLE_PREFIX}create_host_element"
+TEXT_ELEMENT_NAME = f"{AST_GEN_VARIABLE_PREFIX}create_text_element"
+CHILD_NAME = f"{AST_GEN_VARIABLE_PREFIX}child"
+
+# Matches attributes that are directives. The name of the last matched group
+# indicates the kind of directive and the group holds its argument (if any).
+# The name of a slot is held by either the 'slot_name' or 'slot_short' group.
+DIRECTIVE = re.compile(
+    r"(?:v-bind)?:(?P<bind>.+)"
+    r"|(?P<bind_all>v-bind)"
+    r"|(?:v-on:|@)(?P<on>.+)"
+    r"|(?P<slot>v-slot(?::(?P<slot_name>.+))?|#(?P<slot_short>.+))"
+    r"|(?P<other>v-.*)"
+)
 MOUSTACHES = re.compile(r"\{\{.*?\}\}")
+BUILTIN_NAMES = frozenset(dir(builtins))
+
+# Attribute names can't contain quotes, so that a stray quote is an error
+ATTRIBUTE_NAME = r"[^\s\"'=/>]+"
+# Unquoted attribute values, which can contain a '/', but not at the end of
+# a self-closing tag, so that '<a b=x/>' has the value 'x' (like HTMLParser).
+# Those can't contain quotes or a '=' either, so that '<a b== "x">' is an error
+BARE_VALUE = r"(?:[^\s\"'=<>/]|/(?!\s*>))+"
+# Tokens of a CGX file: comments, start/end tags (with their attributes as a
+# single string) and text. A '<' that doesn't start a tag or comment is text,
+# unless it is followed by a letter (or '/' and a letter): then it should be
+# the start of a valid tag (see `CGXParser.feed`).
+CGX_TOKEN = re.compile(
+    r"<!--(?P<comment>.*?)-->"
+    r"|<(?P<closing>/)?(?P<tag>[A-Za-z][^\s/>]*)"
+    rf"(?P<attrs>(?:\s+{ATTRIBUTE_NAME}"
+    rf"(?:\s*=\s*(?:\"[^\"]*\"|'[^']*'|{BARE_VALUE}))?)*)"
+    r"\s*(?:(?P<self_closing>/)\s*)?>"
+    r"|(?P<text>(?:[^<]|<(?![A-Za-z/!]))+|<(?![A-Za-z]|/[A-Za-z]))",
+    re.DOTALL,
+)
+CGX_ATTRIBUTE = re.compile(
+    rf"({ATTRIBUTE_NAME})"
+    r"(?:\s*=\s*(?:\"(?P<double>[^\"]*)\"|'(?P<single>[^']*)'"
+    rf"|(?P<bare>{BARE_VALUE})))?"
+)
+# Tags of which the content is not parsed, but is kept as raw text
+RAW_TEXT_TAGS = ("script", "style")
+
+# Cache of loaded CGX files, mapping from path to a tuple of
+# the cache key (see `_load_cache_key`) and the result of `load`
+_LOAD_CACHE = {}
 
 
 def load(path):
@@ -53,9 +120,98 @@ def load(path):
         </script>
 
     """
-    template = path.read_text()
+    cache_key = _load_cache_key(path)
+    if (cached := _LOAD_CACHE.get(str(path))) and cached[0] == cache_key:
+        component, namespace = cached[1]
+        # Return a copy of the namespace, so that callers can't
+        # modify the globals that the cached component uses
+        return component, dict(namespace)
+
+    code, name = load_code(path, cache_key)
+    component, namespace = _exec_component(code, name, path)
+    _LOAD_CACHE[str(path)] = (cache_key, (component, namespace))
+    return component, dict(namespace)
+
+
+# Provide a way to clear the cache, for instance from tests
+load.cache_clear = _LOAD_CACHE.clear
+
+
+def load_code(path, cache_key=None):
+    """
+    Returns a tuple of the compiled code of a CGX file and the name of the
+    component class that it defines. The code is read from the cache on disk
+    when possible.
+    """
+    if cache_key is None:
+        cache_key = _load_cache_key(path)
+    if cached := _read_code_cache(path, cache_key):
+        return cached
+
+    tree, name = construct_ast(path=path, template=path.read_text())
+    code = compile(tree, filename=str(path), mode="exec")
+    _write_code_cache(path, cache_key, code, name)
+    return code, name
+
+
+def _load_cache_key(path):
+    """
+    Returns the key that determines whether a cached result of `load` for
+    the given path is still valid: the modification time of the file and
+    the settings that influence the generated code.
+    """
+    return (path.stat().st_mtime_ns, CGX_RUNTIME_WARNINGS)
+
+
+def _code_cache_path(path):
+    """Returns the path of the file in which the compiled code for path is cached."""
+    digest = hashlib.sha256(str(Path(path).resolve()).encode()).hexdigest()
+    return CGX_CACHE_DIR / f"{digest}.pyc"
+
+
+def _code_cache_magic():
+    """
+    Returns the magic that identifies the Python version and the version
+    of the code generation of cached code.
+    """
+    return importlib.util.MAGIC_NUMBER + CGX_CODEGEN_VERSION.to_bytes(4, "little")
+
+
+def _read_code_cache(path, cache_key):
+    """
+    Returns a tuple of the cached code object and component name for the given
+    path, or None when there is no valid cached code.
+    """
+    if CGX_CACHE_DIR is None:
+        return None
+    try:
+        with open(_code_cache_path(path), "rb") as fh:
+            magic, key, name, code = marshal.load(fh)
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if magic != _code_cache_magic() or key != cache_key:
+        return None
+    return code, name
+
 
-    return load_from_string(template, path)
+def _write_code_cache(path, cache_key, code, name):
+    """
+    Writes the code object and name of the component for the given path
+    to the cache. Failing to write the cache is not an error.
+    """
+    if CGX_CACHE_DIR is None or sys.dont_write_bytecode:
+        return
+    cache_path = _code_cache_path(path)
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temporary file first and then move it in place, so that
+        # other processes never read a partially written file
+        tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as fh:
+            marshal.dump((_code_cache_magic(), cache_key, name, code), fh)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass
 
 
 def load_from_string(template, path=None):
@@ -70,9 +226,18 @@ def load_from_string(template, path=None):
 
     # Compile the tree into a code object (module)
     code = compile(tree, filename=str(path), mode="exec")
+    return _exec_component(code, name, path)
+
+
+def _exec_component(code, name, path, module_namespace=None):
+    """
+    Executes the compiled code of a CGX file and returns a tuple of the
+    component class with the given name and the module namespace.
+    """
     # Execute the code as module and pass a dictionary that will capture
     # the global and local scope of the module
-    module_namespace = {}
+    if module_namespace is None:
+        module_namespace = {}
     exec(code, module_namespace)
 
     # Check that the class definition is an actual subclass of Component
@@ -103,18 +268,16 @@ def construct_ast(path, template=None):
     # Get the AST from the script tag
     script_tree = get_script_ast(parser, path)
 
-    # Find a list of imported names (or aliases, if any)
-    # Those names don't have to be wrapped by `_lookup`
+    # Find a list of imported names (or aliases, if any) and names that
+    # are bound at module level (functions, classes, assignments).
+    # Those names are resolved statically, so they don't have to be
+    # wrapped by `_lookup`
     imported_names = ImportsCollector()
     imported_names.visit(script_tree)
-
-    # Find the last ClassDef and assume that it is the
-    # component that is defined in the SFC
-    component_def = None
-    for node in reversed(script_tree.body):
-        if isinstance(node, ast.ClassDef):
-            component_def = node
-            break
+    # Collect the module level names and find the last ClassDef, which
+    # is assumed to be the component that is defined in the SFC
+    module_names, component_def = scan_module_body(script_tree)
+    static_names = imported_names.names | module_names
 
     # Create render function as AST and inject into the ClassDef
     template_node = parser.root.child_with_tag("template")
@@ -124,8 +287,44 @@ def construct_ast(path, template=None):
             "There should be precisely one root element defined in "
             f"the template. Found {len(elements)}."
         )
-    render_tree = create_ast_render_function(elements[0], names=imported_names.names)
-    ast.fix_missing_locations(render_tree)
+    render_tree = create_ast_render_function(elements[0], names=static_names)
+
+    # Move the elements that consist of only constants (including all of their
+    # children) out of the render function into attributes of the component
+    # class, so that those are created only once
+    hoist_elements = HoistStaticElements()
+    hoist_elements.visit(render_tree)
+    # Do the same for the props dicts that consist of only constants
+    hoist_constants = HoistConstantProps()
+    hoist_constants.visit(render_tree)
+    assignments = [*hoist_elements.assignments, *hoist_constants.assignments]
+    if hoist_elements.assignments:
+        assignments.insert(
+            0,
+            ast.ImportFrom(
+                module="collagraph.collagraph",
+                names=[
+                    ast.alias(name="create_element", asname=CLASS_CREATE_ELEMENT_NAME),
+                    ast.alias(name="freeze_element", asname=CLASS_FREEZE_ELEMENT_NAME),
+                ],
+                level=0,
+            ),
+        )
+    # Pass the children of DOM elements as a list to a specialized function
+    specialize_elements = SpecializeHostElements()
+    specialize_elements.visit(render_tree)
+    if specialize_elements.specialized:
+        render_tree.body.insert(
+            0,
+            ast.ImportFrom(
+                module="collagraph.collagraph",
+                names=[
+                    ast.alias(name="create_host_element", asname=HOST_ELEMENT_NAME),
+                    ast.alias(name="create_text_element", asname=TEXT_ELEMENT_NAME),
+                ],
+                level=0,
+            ),
+        )
 
     # Put location of render function outside of the script tag
     # This makes sure that the render function can be excluded
@@ -134,15 +333,86 @@ def construct_ast(path, template=None):
     # class at the end of the script node.
     script_node = parser.root.child_with_tag("script")
     line, _ = script_node.end
-    ast.increment_lineno(render_tree, n=line)
+    for node in [*assignments, render_tree]:
+        locate_generated_code(node, line)
+    component_def.body.extend(assignments)
     component_def.body.append(render_tree)
 
-    # Because we modified the AST significantly we need to call an AST
-    # method to fix any `lineno` and `col_offset` attributes of the nodes
-    ast.fix_missing_locations(script_tree)
     return script_tree, component_def.name
 
 
+def locate_generated_code(tree, line):
+    """
+    Sets the `lineno` and `col_offset` attributes of the generated tree, which
+    is placed after the given line. Nodes that were parsed from expressions
+    in the template are moved down by the given number of lines and all
+    other nodes get the location of their parent.
+
+    This is equivalent to `ast.fix_missing_locations` followed by
+    `ast.increment_lineno`, but takes only a single walk over the tree.
+    """
+    todo = [(tree, line + 1, 0, line + 1, 0)]
+    while todo:
+        node, lineno, col_offset, end_lineno, end_col_offset = todo.pop()
+        if "lineno" in node._attributes:
+            if getattr(node, "lineno", None) is None:
+                node.lineno = lineno
+            else:
+                node.lineno = lineno = node.lineno + line
+        if "end_lineno" in node._attributes:
+            if getattr(node, "end_lineno", None) is None:
+                node.end_lineno = end_lineno
+            else:
+                node.end_lineno = end_lineno = node.end_lineno + line
+        if "col_offset" in node._attributes:
+            if getattr(node, "col_offset", None) is None:
+                node.col_offset = col_offset
+            else:
+                col_offset = node.col_offset
+        if "end_col_offset" in node._attributes:
+            if getattr(node, "end_col_offset", None) is None:
+                node.end_col_offset = end_col_offset
+            else:
+                end_col_offset = node.end_col_offset
+        for child in ast.iter_child_nodes(node):
+            todo.append((child, lineno, col_offset, end_lineno, end_col_offset))
+
+
+def check_shadowed_names(component, names):
+    """
+    Warns about imported or module level names that are shadowed by a key in
+    the state or props or by an attribute of the component. The generated
+    render function resolves those names statically, so the value from the
+    component is not used. Called from render functions when
+    CGX_RUNTIME_WARNINGS is enabled.
+    """
+    for name in names:
+        if name in component.state:
+            warnings.warn(
+                f"Found imported or module level name '{name}' "
+                f"as key in self.state: {component}.\n"
+                "If the value from self.state is intended, please resolve by "
+                f"replacing '{name}' with 'state['{name}']'",
+                stacklevel=2,
+            )
+        if name in component.props:
+            warnings.warn(
+                f"Found imported or module level name '{name}' "
+                f"as key in self.props: {component}.\n"
+                "If the value from self.props is intended, please resolve by "
+                f"replacing '{name}' with 'props['{name}']'",
+                stacklevel=2,
+            )
+        if hasattr(component, name):
+            warnings.warn(
+                f"Found imported or module level name '{name}' "
+                f"as attribute on self: {component}.\n"
+                "If the attribute from self is intended, please resolve by "
+                f"replacing '{name}' with 'self.{name}'",
+                stacklevel=2,
+            )
+
+
 def get_script_ast(parser, path):
     """
     Returns the AST created from the script tag in the CGX file.
@@ -171,38 +441,64 @@ def create_ast_render_function(node, names):
             level=0,
         )
     ]
-    if CGX_RUNTIME_WARNINGS:
-        names_str = ", ".join([f"'{name}'" for name in names])
-        code = textwrap.dedent(
-            f"""
-            from warnings import warn as _warn
-
-            for name in {{{names_str}}}:
-                if name in self.state:
-                    _warn(
-                        f"Found imported name '{{name}}' "
-                        f"as key in self.state: {{self}}.\\n"
-                        "If the value from self.state is intended, please resolve by "
-                        f"replacing '{{name}}' with 'state['{{name}}']'"
-                    )
-                if name in self.props:
-                    _warn(
-                        f"Found imported name '{{name}}' "
-                        f"as key in self.props: {{self}}.\\n"
-                        "If the value from self.props is intended, please resolve by "
-                        f"replacing '{{name}}' with 'props['{{name}}']'"
-                    )
-                if hasattr(self, name):
-                    _warn(
-                        f"Found imported name '{{name}}' "
-                        f"as attribute on self: {{self}}.\\n"
-                        "If the attribute from self is intended, please resolve by "
-                        f"replacing '{{name}}' with 'self.{{name}}'"
+    if CGX_RUNTIME_WARNINGS and names:
+        # The following tree is the ast of the following statements:
+        #   from collagraph.cgx.cgx import (
+        #       check_shadowed_names as _ast_check_shadowed_names,
+        #   )
+        #   _ast_check_shadowed_names(self, {...names})
+        check_name = f"{AST_GEN_VARIABLE_PREFIX}check_shadowed_names"
+        extra_statements.extend(
+            [
+                ast.ImportFrom(
+                    module="collagraph.cgx.cgx",
+                    names=[ast.alias(name="check_shadowed_names", asname=check_name)],
+                    level=0,
+                ),
+                ast.Expr(
+                    value=ast.Call(
+                        func=ast.Name(id=check_name, ctx=ast.Load()),
+                        args=[
+                            ast.Name(id="self", ctx=ast.Load()),
+                            ast.Set(
+                                elts=[
+                                    ast.Constant(value=name) for name in sorted(names)
+                                ]
+                            ),
+                        ],
+                        keywords=[],
                     )
-            """
+                ),
+            ]
+        )
+
+    rewriter = RewriteName(skip=names)
+    result = call_create_element(node, rewriter=rewriter)
+    if rewriter.rewritten:
+        # Bind the lookup method and the globals to local variables, so
+        # that every lookup in the template is a fast local variable load:
+        #   _ast_lookup = self._lookup
+        #   _ast_globals = globals()
+        extra_statements.extend(
+            [
+                ast.Assign(
+                    targets=[ast.Name(id=LOOKUP_NAME, ctx=ast.Store())],
+                    value=ast.Attribute(
+                        value=ast.Name(id="self", ctx=ast.Load()),
+                        attr="_lookup",
+                        ctx=ast.Load(),
+                    ),
+                ),
+                ast.Assign(
+                    targets=[ast.Name(id=GLOBALS_NAME, ctx=ast.Store())],
+                    value=ast.Call(
+                        func=ast.Name(id="globals", ctx=ast.Load()),
+                        args=[],
+                        keywords=[],
+                    ),
+                ),
+            ]
         )
-        check_names = ast.parse(code)
-        extra_statements.extend(check_names.body)
 
     return ast.FunctionDef(
         name="render",
@@ -213,30 +509,28 @@ def create_ast_render_function(node, names):
             kw_defaults=[],
             defaults=[],
         ),
-        body=[
-            *extra_statements,
-            ast.Return(value=call_create_element(node, names=names)),
-        ],
+        body=[*extra_statements, ast.Return(value=result)],
         decorator_list=[],
     )
 
 
-def call_create_element(node, *, names):
+def call_create_element(node, *, rewriter):
     """
     Returns an ast.Call of `collagraph.create_element()` with the right args
     for the given node.
 
-    Names is a set of variable names that should not be wrapped in
-    the _lookup method.
+    The rewriter is the RewriteName transformer that is shared by all
+    expressions of the template, and knows which variable names should not
+    be wrapped in the _lookup method.
     """
     return ast.Call(
         func=ast.Name(id="_create_element", ctx=ast.Load()),
-        args=convert_node_to_args(node, names=names),
+        args=convert_node_to_args(node, rewriter=rewriter),
         keywords=[],
     )
 
 
-def call_render_slot(node, *, names=None):
+def call_render_slot(node, *, rewriter):
     slot_name = node.attrs.get("name", "default")
 
     return ast.Starred(
@@ -266,7 +560,7 @@ def call_render_slot(node, *, names=None):
             ),
             # Otherwise, we render the fallback content
             orelse=ast.List(
-                elts=[call_create_element(node, names=names)],
+                elts=[call_create_element(node, rewriter=rewriter)],
                 ctx=ast.Load(),
             ),
         ),
@@ -274,7 +568,7 @@ def call_render_slot(node, *, names=None):
     )
 
 
-def convert_node_to_args(node, *, names=None):
+def convert_node_to_args(node, *, rewriter):
     """
     Converts the node to args that can be passed to `collagraph.create_element()`.
     """
@@ -299,51 +593,48 @@ def convert_node_to_args(node, *, names=None):
     props_keys = []
     props_values = []
 
-    for key, val in node.attrs.items():
+    for kind, key, val in node.props:
         # All non-directive attributes can be constructed easily
-        if not is_directive(key):
+        if kind == "static":
             props_keys.append(ast.Constant(value=key))
             props_values.append(ast.Constant(value=val))
             continue
 
-        if key.startswith((DIRECTIVE_BIND, ":")):
-            if key == DIRECTIVE_BIND:
-                # Use 'None' to mark this is a binding of multiple attributes
-                props_keys.append(None)
-                props_values.append(
-                    RewriteName(skip=names).visit(ast.parse(val, mode="eval")).body
-                )
-            else:
-                _, key = key.split(":")
-                props_keys.append(ast.Constant(value=key))
-                props_values.append(
-                    RewriteName(skip=names).visit(ast.parse(val, mode="eval")).body
-                )
-            continue
-
-        if key.startswith((DIRECTIVE_ON, "@")):
-            split_char = "@" if key.startswith("@") else ":"
-            _, key = key.split(split_char)
-            key = f"on_{key}"
-            props_keys.append(ast.Constant(value=key))
-
-            tree = ast.parse(val, mode="eval")
+        # Use 'None' to mark a binding of multiple attributes
+        props_keys.append(None if key is None else ast.Constant(value=key))
+        tree = parse_expression(val)
+        if kind == "on":
             # v-on directives allow for lambdas which define arguments
             # which need to be skipped by the RewriteName visitor
             lambda_names = LambdaNamesCollector()
             lambda_names.visit(tree)
-            RewriteName(skip=names | lambda_names.names).visit(tree)
-            props_values.append(tree.body)
-            continue
-
-        if key.startswith((DIRECTIVE_FOR)):
-            # Skip right away, parent should've already handled this
-            continue
+            with rewriter.skipping(lambda_names.names):
+                rewriter.visit(tree)
+        else:
+            rewriter.visit(tree)
+        props_values.append(tree.body)
 
     # Construct the other arguments: the children of the node
     children_args = []
+    # Only control flow (and slots) can produce None values, which need to
+    # be filtered out of the children
+    may_produce_none = False
 
     slots = {}
+    # Gather all the non-template children within a component tag and
+    # treat them as the content for the default slot
+    if node.is_component:
+        default_slot_content = [
+            child
+            for child in node.children
+            if isinstance(child, Element) and child.tag != "template"
+        ]
+
+        if default_slot_content:
+            virtual_template_node = Element("template")
+            virtual_template_node.children = default_slot_content
+            slots["default"] = virtual_template_node
+
     control_flow = []
     for child in node.children:
         if isinstance(child, Comment):
@@ -351,7 +642,7 @@ def convert_node_to_args(node, *, names=None):
             continue
 
         if isinstance(child, TextElement):
-            children_args.extend(args_for_text_element(child, names=names))
+            children_args.extend(args_for_text_element(child, rewriter=rewriter))
             continue
 
         directive = None
@@ -359,105 +650,82 @@ def convert_node_to_args(node, *, names=None):
         # Handle for-directives
         if for_expression := child.attrs.get(DIRECTIVE_FOR):
             for_expression = f"[None for {for_expression}]"
-            for_tree = ast.parse(for_expression, mode="eval").body
+            for_tree = parse_expression(for_expression).body
 
             # Find the names that are defined as part of the comprehension(s)
             # E.g: 'i, (a, b) in enumerate(some_collection)' defines the names
             # i, a and b, so we don't want to wrap those names with `_lookup()`
-            name_collector = NameCollector()
+            target_names = set()
             for generator in for_tree.generators:
-                # Apparently, a node visitor does _not_ visit the root node...
-                # So instead, just add the name directly if the root is an ast.Name node
-                if isinstance(generator.target, ast.Name):
-                    name_collector.names.add(generator.target.id)
-                else:
-                    name_collector.generic_visit(generator.target)
-
-            local_names = names.union(name_collector.names)
-            RewriteName(skip=local_names).visit(for_tree)
+                collect_target_names(generator.target, target_names)
 
-            for_tree.elt = call_create_element(child, names=local_names)
+            with rewriter.skipping(target_names):
+                rewriter.visit(for_tree)
+                for_tree.elt = call_create_element(child, rewriter=rewriter)
 
             result = ast.Starred(value=for_tree, ctx=ast.Load())
             children_args.append(result)
             continue
 
         # Handle control flow directives
-        if directive := child.control_flow():
-            if directive == "v-if" and control_flow:
-                children_args.append(create_control_flow_ast(control_flow, names=names))
+        if directive := child.control_flow:
+            if directive == DIRECTIVE_IF and control_flow:
+                children_args.append(
+                    create_control_flow_ast(control_flow, rewriter=rewriter)
+                )
+                may_produce_none = True
                 control_flow = []
             control_flow.append((directive, child))
 
-        # Gather all the non-template children within a component tag and
-        # treat them as the content for the default slot
-        if node.tag[0].isupper() or "." in node.tag:
-            default_slot_content = [
-                child
-                for child in node.children
-                if isinstance(child, Element) and child.tag != "template"
-            ]
-
-            if default_slot_content:
-                virtual_template_node = Element("template")
-                virtual_template_node.children = default_slot_content
-                slots["default"] = virtual_template_node
-
-        for attr in child.attrs.keys():
-            if attr.startswith(("v-slot", "#")):
-                slot_name = attr.split(":")[-1].split("#")[-1]
-                if slot_name == "v-slot":
-                    slot_name = "default"
-                slots[slot_name] = child
+        for slot_name in child.slot_names:
+            slots[slot_name] = child
 
         if not directive:
             if control_flow:
-                children_args.append(create_control_flow_ast(control_flow, names=names))
+                children_args.append(
+                    create_control_flow_ast(control_flow, rewriter=rewriter)
+                )
+                may_produce_none = True
                 control_flow = []
             if child.tag == "slot":
-                children_args.append(call_render_slot(child, names=names))
+                children_args.append(call_render_slot(child, rewriter=rewriter))
+                may_produce_none = True
             else:
-                children_args.append(call_create_element(child, names=names))
+                children_args.append(call_create_element(child, rewriter=rewriter))
 
     if control_flow:
-        children_args.append(create_control_flow_ast(control_flow, names=names))
+        children_args.append(create_control_flow_ast(control_flow, rewriter=rewriter))
+        may_produce_none = True
         control_flow = []
 
     # Create a starred list comprehension that when called, will generate
     # all child elements
-    starred_expr = ast.Starred(
-        value=ast.ListComp(
-            elt=ast.Name(
-                id=f"{AST_GEN_VARIABLE_PREFIX}child",
-                ctx=ast.Load(),
+    starred_expr = None
+    if may_produce_none:
+        starred_expr = ast.Starred(
+            value=ast.ListComp(
+                elt=ast.Name(id=CHILD_NAME, ctx=ast.Load()),
+                generators=[
+                    ast.comprehension(
+                        target=ast.Name(id=CHILD_NAME, ctx=ast.Store()),
+                        iter=ast.List(
+                            elts=children_args,
+                            ctx=ast.Load(),
+                        ),
+                        ifs=[
+                            # Filter out all None elements
+                            ast.Compare(
+                                left=ast.Name(id=CHILD_NAME, ctx=ast.Load()),
+                                ops=[ast.IsNot()],
+                                comparators=[ast.Constant(value=None)],
+                            )
+                        ],
+                        is_async=0,
+                    )
+                ],
             ),
-            generators=[
-                ast.comprehension(
-                    target=ast.Name(
-                        id=f"{AST_GEN_VARIABLE_PREFIX}child",
-                        ctx=ast.Store(),
-                    ),
-                    iter=ast.List(
-                        elts=children_args,
-                        ctx=ast.Load(),
-                    ),
-                    ifs=[
-                        # Filter out all None elements
-                        ast.Compare(
-                            left=ast.Name(
-                                id=f"{AST_GEN_VARIABLE_PREFIX}child",
-                                ctx=ast.Load(),
-                            ),
-                            ops=[ast.IsNot()],
-                            comparators=[ast.Constant(value=None)],
-                        )
-                    ],
-                    is_async=0,
-                )
-            ],
-        ),
-        ctx=ast.Load(),
-    )
+            ctx=ast.Load(),
+        )
     if slots:
         starred_expr = ast.Dict(
             keys=[ast.Constant(value=key) for key in slots.keys()],
@@ -470,7 +738,7 @@ def convert_node_to_args(node, *, names=None):
                         kw_defaults=[],
                         defaults=[],
                     ),
-                    body=call_create_element(val, names=names),
+                    body=call_create_element(val, rewriter=rewriter),
                 )
                 for val in slots.values()
             ],
@@ -514,12 +782,14 @@ def convert_node_to_args(node, *, names=None):
         )
 
     # Return all the arguments
-    if not slots and not children_args:
-        return [type_arg, attr_expression]
+    if starred_expr is None:
+        # When none of the children can be None, then the children can be
+        # passed on as arguments directly
+        return [type_arg, attr_expression, *children_args]
     return [type_arg, attr_expression, starred_expr]
 
 
-def args_for_text_element(child, names):
+def args_for_text_element(child, rewriter):
     args = []
     groups = [match for match in MOUSTACHES.finditer(child.content)]
     if not groups:
@@ -532,9 +802,7 @@ def args_for_text_element(child, names):
             span = group.span()
             string_parts.append(ast.Constant(value=child.content[offset : span[0]]))
             expr = (child.content[span[0] + 2 : span[1] - 2]).strip()
-            expressions.append(
-                RewriteName(skip=names).visit(ast.parse(expr, mode="eval")).body
-            )
+            expressions.append(rewriter.visit(parse_expression(expr)).body)
             offset = span[1]
 
         string_suffix = ast.Constant(value=child.content[offset:])
@@ -597,7 +865,7 @@ def args_for_text_element(child, names):
     return args
 
 
-def create_control_flow_ast(control_flow, *, names):
+def create_control_flow_ast(control_flow, *, rewriter):
     """
     Create an AST of control flow nodes (if/else-if/else)
     """
@@ -606,49 +874,65 @@ def create_control_flow_ast(control_flow, *, names):
     # interested in the actual ast node
     _, else_node = (
         if_else_statements.pop()
-        if if_else_statements and if_else_statements[-1][0] == "v-else"
+        if if_else_statements and if_else_statements[-1][0] == DIRECTIVE_ELSE
         else (None, None)
     )
 
-    rewrite_name = RewriteName(skip=names)
+    # Tests that are literals (e.g. `True` or `0`) are evaluated at compile
+    # time: a falsy branch is dropped and a truthy branch ends the chain
+    branches = []
+    for directive, node in [(if_directive, if_node), *if_else_statements]:
+        test = parse_expression(node.attrs[directive])
+        try:
+            value = ast.literal_eval(test.body)
+        except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+            branches.append(
+                (
+                    rewriter.visit(test).body,
+                    call_create_element(node, rewriter=rewriter),
+                )
+            )
+            continue
+        if value:
+            else_node = node
+            break
 
-    test = ast.parse(if_node.attrs[if_directive], mode="eval")
-    root_statement = ast.IfExp(
-        test=rewrite_name.visit(test).body,
-        body=call_create_element(if_node, names=names),
-        orelse=ast.Constant(value=None),
+    result = (
+        call_create_element(else_node, rewriter=rewriter)
+        if else_node
+        else ast.Constant(value=None)
     )
-    current_statement = root_statement
-
-    for directive, node in if_else_statements:
-        test = ast.parse(node.attrs[directive], mode="eval")
-        if_else_tree = ast.IfExp(
-            test=rewrite_name.visit(test).body,
-            body=call_create_element(node, names=names),
-            orelse=ast.Constant(value=None),
-        )
-        current_statement.orelse = if_else_tree
-        current_statement = if_else_tree
-
-    if else_node:
-        current_statement.orelse = call_create_element(else_node, names=names)
+    for test, body in reversed(branches):
+        result = ast.IfExp(test=test, body=body, orelse=result)
 
-    return root_statement
+    return result
 
 
-def is_directive(key):
-    return key.startswith((DIRECTIVE_PREFIX, ":", "@"))
+def parse_expression(source):
+    """
+    Returns the AST (ast.Expression) for the given template expression.
+
+    NOTE: Parsed trees are deliberately not cached: callers modify the tree
+    in place (rewriting names, fixing locations) and `ast.parse` turns out to
+    be several times faster than a `copy.deepcopy` of a cached tree.
+    Parsing all expressions of a template in a single `ast.parse` call is not
+    faster either: the cost is in creating the AST nodes, not in starting the
+    parser. On top of that, the locations of the nodes would need to be
+    shifted back and the result validated against the individual parse.
+    """
+    return ast.parse(source, mode="eval")
 
 
-class NameCollector(ast.NodeVisitor):
-    """AST node visitor that will create a set of the ids of every Name node
-    it encounters."""
-
-    def __init__(self):
-        self.names = set()
-
-    def visit_Name(self, node):
-        self.names.add(node.id)
+def collect_target_names(node, names):
+    """Adds the names that are bound by the given (comprehension) target
+    to the set of names."""
+    if isinstance(node, ast.Name):
+        names.add(node.id)
+    elif isinstance(node, (ast.Tuple, ast.List)):
+        for element in node.elts:
+            collect_target_names(element, names)
+    elif isinstance(node, ast.Starred):
+        collect_target_names(node.value, names)
 
 
 class LambdaNamesCollector(ast.NodeVisitor):
@@ -672,34 +956,240 @@ class RewriteName(ast.NodeTransformer):
 
     def __init__(self, skip):
         self.skip = skip
+        # Whether any name has been replaced
+        self.rewritten = False
+
+    @contextmanager
+    def skipping(self, names):
+        """Context manager that also skips the given names within its scope."""
+        previous = self.skip
+        self.skip = previous | names
+        try:
+            yield
+        finally:
+            self.skip = previous
 
     def visit_Name(self, node):
-        # Don't try and replace any item from the __builtins__
-        if node.id in __builtins__:
+        # Don't try and replace any of the builtins
+        if node.id in BUILTIN_NAMES:
             return node
 
         # Don't replace any name that should be explicitely skipped
         if node.id in self.skip:
             return node
 
+        # The render function binds `self._lookup` and `globals()` to
+        # local variables (see `create_ast_render_function`)
+        self.rewritten = True
         return ast.Call(
-            func=ast.Attribute(
-                value=ast.Name(id="self", ctx=ast.Load()),
-                attr="_lookup",
-                ctx=ast.Load(),
-            ),
+            func=ast.Name(id=LOOKUP_NAME, ctx=ast.Load()),
             args=[
                 ast.Constant(value=node.id),
-                ast.Call(
-                    func=ast.Name(id="globals", ctx=ast.Load()),
-                    args=[],
-                    keywords=[],
-                ),
+                ast.Name(id=GLOBALS_NAME, ctx=ast.Load()),
             ],
             keywords=[],
         )
 
 
+class HoistStaticElements(ast.NodeTransformer):
+    """AST node transformer that replaces `_create_element` calls for DOM
+    elements that consist of only constants (props and children) with a
+    reference to a class attribute, so that those elements are created once
+    and the reconciler sees the very same elements on every render. Because
+    those are shared, the elements are made read-only with `freeze_element`.
+    """
+
+    def __init__(self):
+        self.assignments = []
+        self.names = {}
+
+    def visit_Call(self, node):
+        if not is_static_element(node):
+            self.generic_visit(node)
+            return node
+
+        # Share a single variable between elements that are equal
+        key = ast.dump(node)
+        if not (name := self.names.get(key)):
+            name = f"_{AST_GEN_VARIABLE_PREFIX}element_{len(self.names)}"
+            self.names[key] = name
+            # Create the element with the create_element function that is
+            # imported in the class body
+            for call in ast.walk(node):
+                if isinstance(call, ast.Call):
+                    call.func = ast.Name(id=CLASS_CREATE_ELEMENT_NAME, ctx=ast.Load())
+            self.assignments.append(
+                ast.Assign(
+                    targets=[ast.Name(id=name, ctx=ast.Store())],
+                    value=ast.Call(
+                        func=ast.Name(id=CLASS_FREEZE_ELEMENT_NAME, ctx=ast.Load()),
+                        args=[node],
+                        keywords=[],
+                    ),
+                )
+            )
+
+        return ast.Attribute(
+            value=ast.Name(id="self", ctx=ast.Load()),
+            attr=name,
+            ctx=ast.Load(),
+        )
+
+
+def is_static_element(node):
+    """Returns whether the node is a `_create_element` call for a DOM element
+    with only constant props and children that are static as well."""
+    return (
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Name)
+        and node.func.id == "_create_element"
+        and not node.keywords
+        and node.args
+        and isinstance(node.args[0], ast.Constant)
+        and (len(node.args) < 2 or is_constant_dict(node.args[1]))
+        and all(
+            isinstance(child, ast.Constant)
+            and isinstance(child.value, str)
+            or is_static_element(child)
+            for child in node.args[2:]
+        )
+    )
+
+
+class HoistConstantProps(ast.NodeTransformer):
+    """AST node transformer that replaces props dicts of `_create_element` calls
+    that consist of only constant keys and values with a reference to a class
+    attribute, so that those dicts are not rebuilt on every render.
+
+    The props of DOM elements are never modified, so those can be shared. The
+    props of components are updated in place, so components get a copy.
+    """
+
+    def __init__(self):
+        self.assignments = []
+        self.names = {}
+
+    def visit_Call(self, node):
+        self.generic_visit(node)
+        if (
+            not isinstance(node.func, ast.Name)
+            or node.func.id != "_create_element"
+            or len(node.args) < 2
+            or not is_constant_dict(node.args[1])
+        ):
+            return node
+
+        props = node.args[1]
+        # Share a single variable between dicts that are equal
+        key = ast.dump(props)
+        if not (name := self.names.get(key)):
+            # Names that start with two underscores are mangled with the name
+            # of the class, so subclasses won't override these attributes
+            name = f"_{AST_GEN_VARIABLE_PREFIX}props_{len(self.names)}"
+            self.names[key] = name
+            self.assignments.append(
+                ast.Assign(
+                    targets=[ast.Name(id=name, ctx=ast.Store())],
+                    value=props,
+                )
+            )
+
+        value = ast.Attribute(
+            value=ast.Name(id="self", ctx=ast.Load()),
+            attr=name,
+            ctx=ast.Load(),
+        )
+        if not isinstance(node.args[0], ast.Constant):
+            # Type is a component (class or function)
+            value = ast.Call(
+                func=ast.Attribute(value=value, attr="copy", ctx=ast.Load()),
+                args=[],
+                keywords=[],
+            )
+        node.args[1] = value
+        return node
+
+
+class SpecializeHostElements(ast.NodeTransformer):
+    """AST node transformer that replaces `_create_element` calls for DOM
+    elements with children by calls to `create_host_element`, which takes the
+    children as a list. So the children are not unpacked into a tuple and
+    normalized on every render: the text children are wrapped with
+    `create_text_element` here instead.
+    """
+
+    def __init__(self):
+        self.specialized = False
+
+    def visit_Call(self, node):
+        self.generic_visit(node)
+        if (
+            not isinstance(node.func, ast.Name)
+            or node.func.id != "_create_element"
+            or len(node.args) < 3
+            or not isinstance(node.args[0], ast.Constant)
+            # Slots are passed as a dict
+            or any(isinstance(child, ast.Dict) for child in node.args[2:])
+        ):
+            return node
+
+        type_arg, props_arg, *children = node.args
+        if (
+            len(children) == 1
+            and isinstance(children[0], ast.Starred)
+            and isinstance(children[0].value, ast.ListComp)
+        ):
+            # A list comprehension (for a v-for directive or for filtering
+            # out the None children) already creates a new list
+            children_arg = children[0].value
+            if isinstance(children_arg.elt, ast.Name) and children_arg.elt.id == (
+                CHILD_NAME
+            ):
+                iterable = children_arg.generators[0].iter
+                iterable.elts = [wrap_text_element(elt) for elt in iterable.elts]
+        else:
+            children_arg = ast.List(
+                elts=[wrap_text_element(child) for child in children],
+                ctx=ast.Load(),
+            )
+
+        self.specialized = True
+        return ast.Call(
+            func=ast.Name(id=HOST_ELEMENT_NAME, ctx=ast.Load()),
+            args=[type_arg, props_arg, children_arg],
+            keywords=[],
+        )
+
+
+def wrap_text_element(node):
+    """Wraps the node in a `create_text_element` call if the node is one of the
+    expressions created by `args_for_text_element`."""
+    if (
+        isinstance(node, ast.Constant)
+        and isinstance(node.value, str)
+        or isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Attribute)
+        and isinstance(node.func.value, ast.Constant)
+        and node.func.value.value == ""
+        and node.func.attr == "join"
+    ):
+        return ast.Call(
+            func=ast.Name(id=TEXT_ELEMENT_NAME, ctx=ast.Load()),
+            args=[node],
+            keywords=[],
+        )
+    return node
+
+
+def is_constant_dict(node):
+    """Returns whether the node is a dict display of only constants."""
+    return (
+        isinstance(node, ast.Dict)
+        and all(isinstance(key, ast.Constant) for key in node.keys)
+        and all(isinstance(value, ast.Constant) for value in node.values)
+    )
+
+
 class ImportsCollector(ast.NodeVisitor):
     def __init__(self):
         self.names = set()
@@ -713,6 +1203,31 @@ class ImportsCollector(ast.NodeVisitor):
             self.names.add(alias.asname or alias.name)
 
 
+def scan_module_body(tree):
+    """
+    Returns the set of names that are bound in the module scope of the given
+    tree by function and class definitions and (annotated) assignments, and
+    the last class definition in the module body (or None).
+    """
+    names = set()
+    class_def = None
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef):
+            names.add(node.name)
+            class_def = node
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            names.add(node.name)
+        elif isinstance(node, (ast.Assign, ast.AnnAssign, ast.AugAssign)):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            for target in targets:
+                names.update(
+                    child.id
+                    for child in ast.walk(target)
+                    if isinstance(child, ast.Name) and isinstance(child.ctx, ast.Store)
+                )
+    return names, class_def
+
+
 class TextElement:
     def __init__(self, content, location=None):
         self.content = content
@@ -734,13 +1249,34 @@ class Element:
         self.location = location
         self.end = None
         self.children = []
-
-    def control_flow(self):
-        """Returns the control flow string (if/else-if/else), if present in the
-        attrs of the node."""
-        for attr in self.attrs:
-            if attr in CONTROL_FLOW_DIRECTIVES:
-                return attr
+        # Tags that start with a capital or contain a dot refer to components
+        self.is_component = tag[0].isupper() or "." in tag
+        # Classify the attributes once into:
+        # * props: tuples of (kind, prop name, value) in the order of the
+        #   attributes, where kind is 'static', 'bind' or 'on' and the name is
+        #   None for a binding of multiple attributes (v-bind)
+        # * slot_names: the names of the slots that this node provides
+        # * control_flow: the control flow directive (if/else-if/else), if any
+        self.props = []
+        self.slot_names = []
+        self.control_flow = None
+        for key, value in self.attrs.items():
+            if not (match := DIRECTIVE.fullmatch(key)):
+                self.props.append(("static", key, value))
+                continue
+
+            kind = match.lastgroup
+            if kind == "bind":
+                self.props.append(("bind", match["bind"], value))
+            elif kind == "bind_all":
+                self.props.append(("bind", None, value))
+            elif kind == "on":
+                self.props.append(("on", f"on_{match['on']}", value))
+            elif kind == "slot":
+                name = match["slot_name"] or match["slot_short"] or "default"
+                self.slot_names.append(name)
+            elif self.control_flow is None and key in CONTROL_FLOW_DIRECTIVES:
+                self.control_flow = key
 
     def child_with_tag(self, tag):
         for child in self.children:
@@ -748,60 +1284,103 @@ class Element:
                 return child
 
 
-class CGXParser(HTMLParser):
+class CGXParser:
     """Parser for CGX files.
 
     Creates a tree of Nodes with all encountered attributes and data.
     """
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
+    def __init__(self):
         self.root = Element("root")
         self.stack = [self.root]
-
-    def handle_starttag(self, tag, attrs):
-        # The tag parameter is lower-cased by the HTMLParser.
-        # In order to figure out whether the tag indicates
-        # an imported class, we need the original casing for
-        # the tag.
-        # Using the original start tag, we can figure out where
-        # the tag is located using a lower-cased version. And then
-        # use the index to extract the original casing for the tag.
-        complete_tag = self.get_starttag_text()
-        index = complete_tag.lower().index(tag)
-        original_tag = complete_tag[index : index + len(tag)]
-        node = Element(original_tag, dict(attrs), location=self.getpos())
-
-        # Cast attributes that have no value to boolean (True)
-        # so that they function like flags
-        for key, value in node.attrs.items():
+        self.data = ""
+        # Line number and offset of the start of the current line, for
+        # translating positions in the data into (line, column) locations
+        self._line = 1
+        self._line_start = 0
+        self._offset = 0
+
+    def feed(self, data):
+        self.data = data
+        pos = 0
+        while match := CGX_TOKEN.match(data, pos):
+            pos = match.end()
+            if (text := match["text"]) is not None:
+                self.handle_data(html.unescape(text), match.start())
+            elif (comment := match["comment"]) is not None:
+                self.handle_comment(comment, match.start())
+            elif match["closing"]:
+                self.handle_endtag(match["tag"], match.start())
+            else:
+                tag = match["tag"]
+                self.handle_starttag(tag, match["attrs"], match.start())
+                if match["self_closing"]:
+                    self.handle_endtag(tag, match.start())
+                elif tag.lower() in RAW_TEXT_TAGS:
+                    # Consume everything up to the closing tag as raw text
+                    closing = re.compile(rf"</{tag}\s*>", re.IGNORECASE)
+                    end = closing.search(data, pos)
+                    end_pos = end.start() if end else len(data)
+                    self.handle_data(data[pos:end_pos], pos)
+                    if end:
+                        self.handle_endtag(tag, end_pos)
+                        end_pos = end.end()
+                    pos = end_pos
+
+        if pos < len(data):
+            line, column = self.location(pos)
+            excerpt = data[pos:].partition("\n")[0]
+            raise ValueError(f"Invalid tag at line {line}, column {column}: {excerpt}")
+
+    def location(self, offset):
+        """Returns the (line, column) location of the given offset in the data."""
+        # Locations are requested in increasing order, so only the
+        # newlines since the last requested location need to be counted
+        newlines = self.data.count("\n", self._offset, offset)
+        if newlines:
+            self._line += newlines
+            self._line_start = self.data.rindex("\n", self._offset, offset) + 1
+        self._offset = offset
+        return self._line, offset - self._line_start
+
+    def handle_starttag(self, tag, attrs, offset):
+        attributes = {}
+        for match in CGX_ATTRIBUTE.finditer(attrs):
+            key = sys.intern(match[1].lower())
+            value = match["double"]
+            if value is None:
+                value = match["single"]
             if value is None:
-                node.attrs[key] = True
+                value = match["bare"]
+            # Cast attributes that have no value to boolean (True)
+            # so that they function like flags
+            attributes[key] = True if value is None else html.unescape(value)
+        node = Element(sys.intern(tag), attributes, location=self.location(offset))
 
         # Add item as child to the last on the stack
         self.stack[-1].children.append(node)
         # Make the new node the last on the stack
         self.stack.append(node)
 
-    def handle_endtag(self, tag):
+    def handle_endtag(self, tag, offset):
         # TODO: pop it till popping the same tag in order to
         # work around unclosed tags?
         # Pop the stack
         node = self.stack.pop()
-        node.end = self.getpos()
+        node.end = self.location(offset)
 
-    def handle_data(self, data):
+    def handle_data(self, data, offset):
         if data.strip():
             # Add item as child to the last on the stack
             self.stack[-1].children.append(
-                TextElement(content=data, location=self.getpos())
+                TextElement(content=data, location=self.location(offset))
             )
 
-    def handle_comment(self, comment):
+    def handle_comment(self, comment, offset):
         if comment.strip():
             # Add item as child to the last on the stack
             self.stack[-1].children.append(
-                Comment(content=comment, location=self.getpos())
+                Comment(content=comment, location=self.location(offset))
             )
 
 
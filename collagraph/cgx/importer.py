@@ -34,13 +34,11 @@ class CgxImporter:
 
     def exec_module(self, module):
         """Executing the module means reading the cgx file"""
-        component, context = cgx.load(self.cgx_path)
-        # Add the default module keys to the context such that
-        # __file__, __name__ and such are available to the loaded module
-        context.update(module.__dict__)
-
-        module.__dict__.update(context)
-        module.__dict__[component.__name__] = component
+        code, name = cgx.load_code(self.cgx_path)
+        # Execute the code in the namespace of the module itself, such that
+        # __file__, __name__ and such are available to the loaded module and
+        # every import (or reload) of the module gets its own component class
+        cgx._exec_component(code, name, self.cgx_path, module.__dict__)
 
 
 # Add the Cgx importer at the end of the list of finders
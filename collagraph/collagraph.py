@@ -1,20 +1,26 @@
+import asyncio
+from bisect import bisect_left
+from collections import deque
+from functools import lru_cache
 from itertools import zip_longest
 import logging
-from operator import xor
-from queue import SimpleQueue
+from operator import attrgetter
 import time
-from typing import Any, Callable, Dict, Iterable, List, Optional
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
 
-from observ import reactive, scheduler, to_raw
+from observ import reactive, readonly, scheduler, to_raw
 from observ.watcher import Watcher
 
 from .compare import equivalent_functions
 from .renderers import Renderer
 from .types import (
+    BEFORE_UNMOUNT_HOOK,
     EffectTag,
     EventLoopType,
     Fiber,
+    MOUNTED_HOOK,
     OpType,
+    UPDATED_HOOK,
     VNode,
 )
 
@@ -23,6 +29,25 @@ logger = logging.getLogger(__name__)
 
 # Node types for which no DOM elements are made
 VIRTUAL_NODE_TYPES = {"template", "slot"}
+# Number of units of work between checks whether the deadline has passed
+DEADLINE_CHECK_STRIDE = 8
+# Time budget for a batch of work when no deadline is given (in ns)
+FRAME_BUDGET_NS = 16_000_000
+# Work yields when less than this time remains before the deadline (in ns)
+YIELD_THRESHOLD_NS = 1_000_000
+# Prop value types for which elements without children can be cached. Floats
+# are left out, because equal floats can differ (e.g. 0.0 and -0.0) and NaN
+# is not even equal to itself, so those don't work as keys of the cache
+SCALAR_TYPES = frozenset({str, int, bool, type(None)})
+# Maximum number of cached elements without children
+LEAF_ELEMENT_CACHE_SIZE = 1024
+# Effect tags bound to module globals, because looking up a member on an
+# Enum class is relatively slow
+PLACEMENT = EffectTag.PLACEMENT
+UPDATE = EffectTag.UPDATE
+DELETION = EffectTag.DELETION
+# Event type for each event prop (`on_*`) that has been seen
+EVENT_TYPES: Dict[str, str] = {}
 
 
 class NotifyChangeWatcher(Watcher):
@@ -35,7 +60,9 @@ class NotifyChangeWatcher(Watcher):
     """
 
     def update(self):
-        """On update, simply run the callback."""
+        """On update, mark the watcher as dirty and simply run the callback.
+        The dirty flag is reset when the watcher is evaluated."""
+        self.dirty = True
         self.callback()
 
 
@@ -48,8 +75,34 @@ def watch(fn, cb, lazy=False, deep=False, **kwargs):
 
 
 def create_element(type, props=None, *children) -> VNode:
-    """Create an element description, based on type, props and (optionally) children"""
-    key = props.get("key", None) if props is not None else None
+    """Create an element description, based on type, props and (optionally) children
+
+    The props of elements without children of which all the values are scalars
+    (e.g. strings and integers) are cached and shared between elements, so
+    those are read-only. The key of an element (`props["key"]`), if any, should
+    be hashable.
+    """
+    # NOTE: the type is deliberately not passed through `sys.intern`: string
+    # literals in Python code are constants of the code object (and interned
+    # when they look like identifiers) and the CGX parser interns all tags
+    # and attribute names, so interning here would only add a call
+    if props is None:
+        props = {}
+        key = None
+    else:
+        key = props.get("key", None)
+    # Fast path for elements without children (e.g. most leaf elements)
+    if not children:
+        # The props of host elements with only scalar props are shared
+        # between renders (and are therefore read-only)
+        if type.__class__ is str and props.__class__ is dict:
+            items = tuple((name, val.__class__, val) for name, val in props.items())
+            for _, val_type, _ in items:
+                if val_type not in SCALAR_TYPES:
+                    break
+            else:
+                return VNode(type, leaf_props(items), (), key)
+        return VNode(type, reactive(props), (), key)
     children = [
         child if not isinstance(child, str) else create_text_element(child)
         for child in children
@@ -61,7 +114,37 @@ def create_element(type, props=None, *children) -> VNode:
         # If children is 1 callable item, then it becomes the default slot
         elif callable(children[0]):
             children = {"default": children[0]}
-    return VNode(type, reactive(props or {}), children or tuple(), key)
+    return VNode(type, reactive(props), children, key)
+
+
+@lru_cache(maxsize=LEAF_ELEMENT_CACHE_SIZE)
+def leaf_props(items):
+    """Create the read-only props of an element without children from a tuple
+    of (name, type, value) items. The value types are part of the items so that
+    for instance 1 and True don't share props. Because the result is cached
+    and shared between elements (and Collagraph instances), it is read-only."""
+    return readonly({name: val for name, _, val in items})
+
+
+def create_host_element(type, props, children) -> VNode:
+    """Create an element for a DOM element from a props dict and a new list of
+    child elements. Unlike `create_element`, the children are used as-is: text
+    children should be wrapped with `create_text_element` already and the list
+    can't be a slots definition. Used by the render functions of CGX
+    components, which know the shape of the elements up front."""
+    return VNode(type, reactive(props), children, props.get("key", None))
+
+
+def freeze_element(element: VNode) -> VNode:
+    """Returns a read-only copy of the element and all of its children. Used for
+    the static elements of CGX components, which are shared between renders
+    (and Collagraph instances)."""
+    return VNode(
+        element.type,
+        readonly(to_raw(element.props)),
+        tuple(freeze_element(child) for child in element.children),
+        element.key,
+    )
 
 
 def create_text_element(text):
@@ -104,11 +187,12 @@ class Collagraph:
         self._wip_root: Fiber = None
         self._next_unit_of_work: Fiber = None
         self._deletions: List[Fiber] = None
+        # Whether the WIP tree inserts or moves any elements
+        self._restructured = False
         self._render_callback: Callable = None
-        self._request = None
-        self._qt_timer = None
-        self._work = SimpleQueue()
         self._dirty = False
+        # Whether the work loop was rescheduled because it started too late
+        self._rescheduled = False
 
     def render(self, element: VNode, container, callback=None):
         self._wip_root = Fiber(
@@ -119,6 +203,7 @@ class Collagraph:
         )
 
         self._deletions = []
+        self._restructured = False
         self._next_unit_of_work = self._wip_root
         self._render_callback = callback
 
@@ -132,42 +217,56 @@ class Collagraph:
             deadline: targetted deadline for until when work can be done. If
                 no deadline is given, then it will be set to 16ms from now.
         """
-        # current in ns
-        if not deadline:
-            deadline = time.perf_counter_ns() + 16 * 1000000
-
         if self.event_loop_type is EventLoopType.SYNC:
             self.work_loop(deadline=None)
             return
 
-        if not self._request:
-            if self.event_loop_type is EventLoopType.DEFAULT:
-                import asyncio
-
-                def start(deadline):
-                    loop = asyncio.get_event_loop_policy().get_event_loop()
-                    loop.call_soon(self.work_loop, deadline)
-
-                self._request = start
+        # current in ns
+        if not deadline:
+            deadline = time.perf_counter_ns() + FRAME_BUDGET_NS
 
-        self._request(deadline)
+        # Pass the deadline as an argument so that no closure is needed
+        loop = asyncio.get_event_loop_policy().get_event_loop()
+        loop.call_soon(self.work_loop, deadline)
 
     def work_loop(self, deadline: int):
         """
         Performs work until right before the deadline or when the work runs out.
-        Will at least perform one unit of work (if `_next_unit_of_work` is not None).
+        If the deadline has already passed when the work loop starts, then the
+        work is rescheduled without doing any work, so that other events get
+        handled first. This happens at most once in a row, so otherwise it
+        will at least perform one unit of work (if `_next_unit_of_work` is not
+        None).
         NOTE: when sync is True, the deadline is not taken into account and all
         work will be done in sync until there is no more work.
         """
-        should_yield = False
-        while self._next_unit_of_work and not should_yield:
-            self._next_unit_of_work = self.perform_unit_of_work(self._next_unit_of_work)
-            # yield if time is up
-            now = time.perf_counter_ns()
-            should_yield = (
-                self.event_loop_type is not EventLoopType.SYNC
-                and (deadline - now) < 1 * 1000000
-            )
+        perform_unit_of_work = self.perform_unit_of_work
+        if self.event_loop_type is EventLoopType.SYNC:
+            while self._next_unit_of_work:
+                self._next_unit_of_work = perform_unit_of_work(self._next_unit_of_work)
+        else:
+            if (
+                self._next_unit_of_work
+                and not self._rescheduled
+                and time.perf_counter_ns() >= deadline
+            ):
+                # Started too late: yield to other events and try again
+                self._rescheduled = True
+                self.request_idle_work()
+                return
+            self._rescheduled = False
+
+            # Only check the time every few units of work, because the clock
+            # is relatively expensive compared to a single unit of work
+            perf_counter_ns = time.perf_counter_ns
+            units = 0
+            while self._next_unit_of_work:
+                self._next_unit_of_work = perform_unit_of_work(self._next_unit_of_work)
+                units += 1
+                # yield if time is up
+                if units % DEADLINE_CHECK_STRIDE == 0:
+                    if (deadline - perf_counter_ns()) < YIELD_THRESHOLD_NS:
+                        break
 
         if not self._next_unit_of_work and self._wip_root:
             # All the preparations to build the new WIP root have been performed,
@@ -186,13 +285,14 @@ class Collagraph:
                 self._render_callback()
 
     def perform_unit_of_work(self, fiber: Fiber) -> Optional[Fiber]:
-        is_function_or_class_component = callable(fiber.type)
-        if is_function_or_class_component:
-            is_class_component = isinstance(fiber.type, type)
-            if is_class_component:
-                self.update_class_component(fiber)
-            else:
-                self.update_function_component(fiber)
+        # Host elements are by far the most common, and have a str type
+        fiber_type = fiber.type
+        if fiber_type.__class__ is str:
+            self.update_host_component(fiber)
+        elif isinstance(fiber_type, type):
+            self.update_class_component(fiber)
+        elif callable(fiber_type):
+            self.update_function_component(fiber)
         else:
             self.update_host_component(fiber)
 
@@ -222,7 +322,10 @@ class Collagraph:
         # Attach the component instance to the fiber
         fiber.component = component
 
-        component._slots = fiber.children if isinstance(fiber.children, dict) else {}
+        slots = fiber.children if isinstance(fiber.children, dict) else {}
+        # Slots are not reactive, so replaced slots always require a new render
+        slots_replaced = slots is not component._slots and (slots or component._slots)
+        component._slots = slots
 
         if fiber.alternate:
             fiber.alternate.component = None
@@ -230,8 +333,10 @@ class Collagraph:
             fiber.alternate.watcher = None
 
         if fiber.watcher:
-            # Re-evaluate the watcher to get the new value
-            fiber.watcher.evaluate()
+            # Re-evaluate the watcher to get the new value, but only when any
+            # of the dependencies of the render function changed
+            if fiber.watcher.dirty or slots_replaced:
+                fiber.watcher.evaluate()
         else:
             fiber.watcher = watch(
                 component.render,
@@ -261,13 +366,20 @@ class Collagraph:
         if not fiber.dom and fiber.type not in VIRTUAL_NODE_TYPES:
             fiber.dom = self.create_dom(fiber)
 
-        if fiber.alternate:
-            fiber.alternate.watcher = None
+        props = fiber.props
+        alternate = fiber.alternate
+        if alternate and alternate.watcher and alternate.props is props:
+            # The watcher of the alternate already watches these very props
+            fiber.watcher = alternate.watcher
+            alternate.watcher = None
+        else:
+            if alternate:
+                alternate.watcher = None
 
-        fiber.watcher = watch(
-            lambda: fiber.props.keys(),
-            lambda: self.state_updated(fiber),
-        )
+            fiber.watcher = watch(
+                lambda: props.keys(),
+                lambda: self.state_updated(fiber),
+            )
 
         # Create new fibers
         self.reconcile_children(fiber, fiber.children)
@@ -292,17 +404,33 @@ class Collagraph:
         self._wip_root.alternate = self._current_root
         self._next_unit_of_work = self._wip_root
         self._deletions = []
+        self._restructured = False
         self.request_idle_work()
 
     def state_updated(self, fiber: Fiber):
+        """Called by the watchers when any state that a fiber depends on is
+        changed. Unless the event loop type is SYNC, the new render pass is
+        scheduled on the event loop, so all changes made within the same tick
+        end up in one render pass. Changes during a render pass mark it as
+        dirty, which results in one more render pass once it is committed."""
         self._dirty = True
 
         if not self._wip_root:
             self.prepare_next_iteration_of_work()
 
     def reconcile_children(self, wip_fiber: Fiber, elements: List[VNode]):
+        try:
+            self._reconcile_children(wip_fiber, elements)
+        except TypeError as e:
+            # The keys of the elements are used in dicts and sets, so an
+            # unhashable key results in a (rather cryptic) TypeError
+            check_keys(elements, e)
+            raise
+
+    def _reconcile_children(self, wip_fiber: Fiber, elements: List[VNode]):
         # The old fiber, which holds the state as it was rendered to DOM
-        old_fiber = wip_fiber.alternate and wip_fiber.alternate.child
+        alternate = wip_fiber.alternate
+        old_fiber = alternate and alternate.child
 
         # Create list of old_fibers, from the sibling of the old_fiber
         old_fibers = []
@@ -313,74 +441,113 @@ class Collagraph:
                 old_fibers.append(sibling)
                 sibling = sibling.sibling
 
-        def matcher(x, y):
-            return x.key == y.key
-
-        ordered_old_fibers, removals = compare(elements, old_fibers, match=matcher)
-
-        operations = {}
-        if len(elements) > 1:
-            new_keys = [el.key for el in elements if el and el.key]
-            old_keys = [fib.key for fib in old_fibers if fib and fib.key]
-
-            ops = create_ops(old_keys, new_keys)
-
-            for op in ops:
-                if op["op"] is not OpType.DEL:
-                    if "anchor" in op:
-
-                        def match(el, key):
-                            return el.key == key
+        if (
+            alternate is not None
+            and elements is alternate.children
+            and not callable(wip_fiber.type)
+            and len(old_fibers) == len(elements)
+        ):
+            # The old fibers were created from the very same elements, so they
+            # already match the elements one by one, in order
+            ordered_old_fibers, removals = old_fibers, []
+            operations = {}
+        else:
+            ordered_old_fibers, removals = compare(
+                elements, old_fibers, key=attrgetter("key")
+            )
 
-                        anchor = first(old_fibers, match, op["anchor"])
-                        operations[op["value"]] = anchor.dom
+            operations = {}
+            if len(elements) > 1:
+                new_keys = [el.key for el in elements if el and el.key]
+                old_keys = [fib.key for fib in old_fibers if fib and fib.key]
+
+                # Comparing the lists of keys is cheap (and done in C), while
+                # creating the operations walks over the keys in Python
+                ops = create_ops(old_keys, new_keys) if old_keys != new_keys else []
+
+                if ops:
+                    # Lookup for the first old fiber for each key
+                    old_fibers_by_key = {}
+                    for fib in reversed(old_fibers):
+                        old_fibers_by_key[fib.key] = fib
+
+                    for op in ops:
+                        if op["op"] is not OpType.DEL:
+                            if "anchor" in op:
+                                anchor = old_fibers_by_key[op["anchor"]]
+                                operations[op["value"]] = anchor.dom
+                            else:
+                                # Move to (or add at) the end
+                                operations[op["value"]] = None
+                    if operations:
+                        self._restructured = True
+
+        # The dom element in which the dom elements of the new fibers are placed
+        dom_parent = (
+            wip_fiber.dom if wip_fiber.dom is not None else wip_fiber.dom_parent
+        )
 
         # In here, all the 'new' elements are compared to the old/current fiber/state
+        # NOTE: the loop runs for every child of every fiber, so the lookups
+        # that it needs are bound to local names first
+        # NOTE: the fibers are double buffered: new fibers are recycled from the
+        # tree before the current one (`old_fiber.alternate`), so re-rendering
+        # the same shape doesn't allocate any fibers. Deleted fibers are not
+        # pooled for reuse though, because the previous tree might still refer
+        # to them (see `commit_deletion`) and they would end up in two trees.
+        get_anchor = operations.get
+        append_deletion = self._deletions.append
         prev_sibling = None
         for element, old_fiber in zip_longest(elements, ordered_old_fibers + removals):
             new_fiber = None
             same_type = old_fiber and element and element.type == old_fiber.type
 
+            if element:
+                props = element.props
+                key = element.key
             if same_type:
                 # Configure a fiber for updating a DOM element
                 new_fiber = old_fiber.alternate or Fiber()
                 new_fiber.type = element.type
-                new_fiber.props = element.props
-                new_fiber.props_snapshot = to_raw(element.props)
+                new_fiber.props = props
+                new_fiber.props_snapshot = to_raw(props)
                 new_fiber.children = element.children
-                new_fiber.key = element.key
+                new_fiber.key = key
                 new_fiber.dom = old_fiber.dom
+                new_fiber.dom_parent = dom_parent
                 new_fiber.parent = wip_fiber
                 new_fiber.alternate = old_fiber
                 new_fiber.child = None
                 new_fiber.sibling = None
-                new_fiber.effect_tag = EffectTag.UPDATE
+                new_fiber.effect_tag = UPDATE
                 new_fiber.watcher = None
-                new_fiber.move = new_fiber.key in operations
-                new_fiber.anchor = operations.get(new_fiber.key)
+                new_fiber.move = key in operations
+                new_fiber.anchor = get_anchor(key)
             if element and not same_type:
                 # Configure a fiber for creating a new DOM element
                 new_fiber = (old_fiber and old_fiber.alternate) or Fiber()
                 new_fiber.type = element.type
-                new_fiber.props = element.props
-                new_fiber.props_snapshot = to_raw(element.props)
+                new_fiber.props = props
+                new_fiber.props_snapshot = to_raw(props)
                 new_fiber.children = element.children
-                new_fiber.key = element.key
+                new_fiber.key = key
                 new_fiber.dom = None
+                new_fiber.dom_parent = dom_parent
                 new_fiber.parent = wip_fiber
                 new_fiber.alternate = None
                 new_fiber.child = None
                 new_fiber.sibling = None
-                new_fiber.effect_tag = EffectTag.PLACEMENT
+                new_fiber.effect_tag = PLACEMENT
                 new_fiber.watcher = None
                 new_fiber.move = False
-                new_fiber.anchor = operations.get(new_fiber.key)
+                new_fiber.anchor = get_anchor(key)
+                self._restructured = True
                 # NOTE: If there is an old_fiber, then it will be
                 # marked for deletion in the next if statement
             if old_fiber and not same_type:
                 # Mark the old fiber for deletion so that DOM element will be removed
-                old_fiber.effect_tag = EffectTag.DELETION
-                self._deletions.append(old_fiber)
+                old_fiber.effect_tag = DELETION
+                append_deletion(old_fiber)
 
             # And we add it to the fiber tree setting it either as a child or as a
             # sibling, depending on whether it’s the first child or not.
@@ -399,58 +566,72 @@ class Collagraph:
         the work starts with the `child` attribute of the `_wip_root` (once all fibers
         that have been marked for deletion have been removed.
         """
-        for deletion in self._deletions:
-            self._work.put(deletion)
-        self._deletions = []
-        self._work.put(self._wip_root.child)
-
-        while not self._work.empty():
-            work = self._work.get()
-            self.commit_work(work)
-
-        # Use a queue to walk through the whole tree of fibers in order to
-        # call component hooks (e.g: mounted, updated). The walk starts with
-        # the root down to the leaves.
-        # Here we use a tuple consisting of a fiber and boolean that indicates
-        # whether we are traversing down to the leaves, or going back up to
-        # a parent node. Only at the end of a collection of siblings we move
-        # back up at which point we know for certain that all children for
-        # the parent node have been processed, hence we can call the component
-        # hooks on the way up.
-        component_hooks = SimpleQueue()
-        component_hooks.put((self._wip_root, True))
-
-        # parent_component = None
-        while not component_hooks.empty():
+        container = self._wip_root.dom
+        # Only changes to the structure of the DOM are bracketed by the commit
+        # hooks: a renderer might repaint the whole container afterwards, while
+        # (small) updates of attributes are cheaper on their own
+        restructured = self._restructured or bool(self._deletions)
+        if restructured:
+            self.renderer.commit_begin(container)
+        try:
+            for deletion in self._deletions:
+                self.commit_deletion(deletion, deletion.dom_parent)
+            self._deletions = []
+
+            # Walk the tree of fibers depth-first (children before siblings)
+            # with an explicit stack instead of recursion
+            stack = [self._wip_root.child]
+            while stack:
+                fiber = stack.pop()
+                if fiber is None:
+                    continue
+                self.commit_placement_or_update(fiber)
+                stack.append(fiber.sibling)
+                stack.append(fiber.child)
+        finally:
+            if restructured:
+                self.renderer.commit_end(container)
+
+        # Walk through the whole tree of fibers in order to call component
+        # hooks (e.g: mounted, updated). The walk starts with the root down to
+        # the leaves.
+        # Here we keep track of a fiber and a boolean that indicates whether
+        # we are traversing down to the leaves, or going back up to a parent
+        # node. Only at the end of a collection of siblings we move back up at
+        # which point we know for certain that all children for the parent
+        # node have been processed, hence we can call the component hooks on
+        # the way up.
+        fiber, down = self._wip_root, True
+        while fiber:
             # `down` is whether the tree is walked down toward the leaves
             # or up, back towards the root. On the way back, all the children
             # for the current fiber have been processed
-            fiber, down = component_hooks.get()
-            if not fiber:
-                continue
 
             # Process children first
             if down and fiber.child:
-                component_hooks.put((fiber.child, True))
+                fiber = fiber.child
                 continue
 
             if fiber.mounted:
-                if fiber.component:
-                    fiber.component._element = fiber.child.dom
-                    fiber.component.mounted()
+                if component := fiber.component:
+                    component._element = fiber.child.dom
+                    if component.__hooks__ & MOUNTED_HOOK:
+                        component.mounted()
                 fiber.mounted = False
                 fiber.updated = False
             elif fiber.updated:
-                if fiber.component:
-                    fiber.component.updated()
+                if (component := fiber.component) and (
+                    component.__hooks__ & UPDATED_HOOK
+                ):
+                    component.updated()
                 fiber.updated = False
 
             if fiber.sibling:
-                component_hooks.put((fiber.sibling, True))
+                fiber, down = fiber.sibling, True
             else:
                 # The last of the siblings signals the
                 # parent that we're walking back
-                component_hooks.put((fiber.parent, False))
+                fiber, down = fiber.parent, False
 
         self._current_root = self._wip_root
         self._wip_root = None
@@ -458,54 +639,66 @@ class Collagraph:
     def commit_deletion(self, fiber: Fiber, dom_parent: Any):
         """
         Remove an item from the dom. If the given fiber does not reference
-        a dom element, then it will try its child (recursively) until it finds
-        a fiber with a dom element that can be removed.
+        a dom element, then it will try its child (and the child of that child,
+        and so on) until it finds a fiber with a dom element that can be removed.
         Clears the child and dom attributes of the fiber.
         """
-        if fiber.component:
-            if not fiber.unmounted:
-                fiber.component.before_unmount()
-                fiber.unmounted = True
-
-        def traverse_before_unmount(fiber):
-            if fiber is None:
-                return
-            if fiber.component:
-                if not fiber.unmounted:
-                    fiber.component.before_unmount()
-                    fiber.unmounted = True
-            traverse_before_unmount(fiber.child)
-            traverse_before_unmount(fiber.sibling)
-
-        traverse_before_unmount(fiber.child)
-
-        if fiber.dom is not None:
-            self.renderer.remove(fiber.dom, dom_parent)
-            fiber.dom = None
-        else:
-            self.commit_deletion(fiber.child, dom_parent)
-
-        fiber.child = None
-        fiber.sibling = None
-
-    def commit_work(self, fiber: Fiber):
-        if not fiber:
-            return
-
-        dom_parent_fiber = fiber.parent
-        while dom_parent_fiber.dom is None:
-            dom_parent_fiber = dom_parent_fiber.parent
-        dom_parent = dom_parent_fiber.dom
-
-        if fiber.effect_tag == EffectTag.PLACEMENT:
-            if fiber.component:
-                self.update_dom_or_component(
-                    fiber, None, prev_props={}, next_props=fiber.props
-                )
+        # Call the before_unmount hook of the fiber and every component below.
+        # Afterwards, release the element of the component: the event handlers
+        # of the elements usually refer back to the component (bound methods),
+        # so otherwise the component and its elements form a reference cycle.
+        # Also clear the references back up the tree, to the alternate and to
+        # the watcher (which refers back to the fiber) for each fiber, so that
+        # the deleted fibers don't form reference cycles and are cleaned up by
+        # reference counting instead of by the cycle collector. (The parent in
+        # the previous tree still refers to the fiber until it gets recycled.)
+        stack = [fiber]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            if (component := node.component) and not node.unmounted:
+                if component.__hooks__ & BEFORE_UNMOUNT_HOOK:
+                    component.before_unmount()
+                component._element = None
+                node.unmounted = True
+            if node is not fiber:
+                stack.append(node.sibling)
+            stack.append(node.child)
+            node.parent = None
+            node.alternate = None
+            node.watcher = None
+
+        # Remove the first dom element that is found by following the children
+        while fiber is not None:
+            child = fiber.child
+            fiber.child = None
+            fiber.sibling = None
+            if fiber.dom is not None:
+                self.renderer.remove(fiber.dom, dom_parent)
+                fiber.dom = None
+                break
+            fiber = child
+
+    def commit_placement_or_update(self, fiber: Fiber):
+        """Commit a fiber from the WIP tree. Fibers that are marked for deletion
+        are not part of that tree: those are committed with `commit_deletion`."""
+        dom_parent = fiber.dom_parent
+
+        if (effect_tag := fiber.effect_tag) is PLACEMENT:
+            if component := fiber.component:
+                # The component was just created with the props of the fiber, so
+                # only the event handlers have to be added. Writing the props to
+                # the component again would notify its watcher and trigger yet
+                # another render pass for the component.
+                for key, val in fiber.props.items():
+                    if key[:3] == "on_":
+                        event_type = EVENT_TYPES.get(key) or key_to_event(key)
+                        component.add_event_handler(event_type, val)
                 fiber.mounted = True
             if fiber.dom is not None:
                 self.renderer.insert(fiber.dom, dom_parent, anchor=fiber.anchor)
-        elif fiber.effect_tag == EffectTag.UPDATE:
+        elif effect_tag is UPDATE:
             if fiber.dom is not None:
                 if fiber.move:
                     self.renderer.remove(fiber.dom, dom_parent)
@@ -514,17 +707,15 @@ class Collagraph:
                         dom_parent,
                         anchor=fiber.anchor,
                     )
-            self.update_dom_or_component(
-                fiber,
-                fiber.dom,
-                prev_props=fiber.alternate.props_snapshot,
-                next_props=fiber.props_snapshot,
-            )
-        elif fiber.effect_tag == EffectTag.DELETION:
-            self.commit_deletion(fiber, dom_parent)
-
-        self._work.put(fiber.child)
-        self._work.put(fiber.sibling)
+            prev_props = fiber.alternate.props_snapshot
+            next_props = fiber.props_snapshot
+            if not same_props(prev_props, next_props):
+                self.update_dom_or_component(
+                    fiber,
+                    fiber.dom,
+                    prev_props=prev_props,
+                    next_props=next_props,
+                )
 
     def update_dom_or_component(
         self, fiber: Fiber, dom: Any, prev_props: Dict, next_props: Dict
@@ -541,35 +732,36 @@ class Collagraph:
         attrs_to_remove = {}
         attrs_to_update = {}
         events_to_add = {}
-        equivalent_event_handlers = set()
-
-        for key, val in prev_props.items():
-            if is_event(key):
-                if key in next_props and is_equivalent_event_handler(
-                    val, next_props, key
-                ):
-                    equivalent_event_handlers.add(key)
-                    continue
-
-                event_type = key_to_event(key)
-                events_to_remove[event_type] = val
-            else:
-                # Is key gone?
-                if key not in next_props:
-                    attrs_to_remove[key] = prev_props[key]
 
         for key, val in next_props.items():
-            if is_event(key):
-                if key in equivalent_event_handlers:
-                    continue
-
-                event_type = key_to_event(key)
-                events_to_add[event_type] = next_props[key]
+            # Events start with `on_`
+            if key[:3] == "on_":
+                event_type = EVENT_TYPES.get(key) or key_to_event(key)
+                if key in prev_props:
+                    prev_val = prev_props[key]
+                    if equivalent_functions(prev_val, val):
+                        continue
+                    events_to_remove[event_type] = prev_val
+                events_to_add[event_type] = val
             else:
-                # Is key new or changed?
-                if is_new(val, prev_props, key):
+                # Is key new or changed? Values are only compared when neither
+                # of them is None, because some types (e.g. Qt flags) raise a
+                # TypeError when compared with None
+                prev_val = prev_props.get(key)
+                if (prev_val is None) is not (val is None) or prev_val != val:
                     attrs_to_update[key] = val
 
+        # Only walk the previous props when keys have been removed, but do so
+        # in order, so that items are removed in a predictable order
+        if prev_props and (removed := prev_props.keys() - next_props.keys()):
+            for key, val in prev_props.items():
+                if key in removed:
+                    if key[:3] == "on_":
+                        event_type = EVENT_TYPES.get(key) or key_to_event(key)
+                        events_to_remove[event_type] = val
+                    else:
+                        attrs_to_remove[key] = val
+
         if fiber.component:
             # Get a writable reference to the read-only props of the component
             props = reactive(fiber.component.props)
@@ -589,8 +781,8 @@ class Collagraph:
                 # Mark the fiber as updated
                 fiber.updated = True
         elif dom:
-            for event_type, val in events_to_remove.items():
-                self.renderer.remove_event_listener(dom, event_type, val)
+            if events_to_remove:
+                self.renderer.remove_event_listeners(dom, events_to_remove)
 
             for key, val in attrs_to_remove.items():
                 self.renderer.remove_attribute(dom, key, val)
@@ -598,8 +790,8 @@ class Collagraph:
             for key, val in attrs_to_update.items():
                 self.renderer.set_attribute(dom, key, val)
 
-            for event_type, val in events_to_add.items():
-                self.renderer.add_event_listener(dom, event_type, val)
+            if events_to_add:
+                self.renderer.add_event_listeners(dom, events_to_add)
 
             # Climb up the tree to find first component to mark as updated
             if events_to_remove or events_to_add or attrs_to_remove or attrs_to_update:
@@ -614,57 +806,84 @@ class Collagraph:
                     parent = parent.parent
 
 
-def is_event(key):
-    return key.startswith("on_")
+def check_keys(elements: List[VNode], error: Exception):
+    """Raises a TypeError that names the element of which the key is not
+    hashable, if there is one."""
+    for element in elements:
+        if element is None:
+            continue
+        try:
+            hash(element.key)
+        except TypeError:
+            raise TypeError(
+                f"The key of element {element.type!r} should be hashable, "
+                f"got: {element.key!r}"
+            ) from error
+
+
+def same_props(prev_props, next_props):
+    """Returns True when both props dicts have the same keys and the values
+    are the very same objects, in which case there is nothing to update."""
+    if len(prev_props) != len(next_props):
+        return False
+    for key, val in next_props.items():
+        if key not in prev_props or prev_props[key] is not val:
+            return False
+    return True
 
 
 def key_to_event(key):
     # Events start with `on_`
-    return key[3:].lower()
-
-
-def is_new(val, other, key):
-    old_value = other.get(key)
-    return xor(old_value is None, val is None) or old_value != val
-
-
-def is_equivalent_event_handler(val, other, key):
-    alt = other.get(key)
-    return equivalent_functions(val, alt)
-
-
-def indexOf(items: Iterable, match: Callable, *args):
-    """Returns the index of the first item for which the `match` function returns
-    True."""
-    for idx, item in enumerate(items):
-        if match(item, *args):
-            return idx
-
+    event_type = key[3:].lower()
+    EVENT_TYPES[key] = event_type
+    return event_type
 
-def first(items: Iterable, match: Callable, *args):
-    """Returns the first item for which the `match` function returns True."""
-    idx = indexOf(items, match, *args)
-    return items[idx] if idx is not None else None
 
-
-def compare(a: Iterable, b: Iterable, match: Callable):
+def compare(a: Iterable, b: Iterable, key: Callable):
     """Returns a list of `matches` between a and b and `removals` which contain
     items that are in b but not in a.
 
+    Items match when the `key` function returns the same (hashable) value for
+    them. Each item in a is matched with the first unmatched item in b with the
+    same key.
     The list of matches has the same length as a and contains 'None' values at
     positions for which no match was found in b.
     """
-    b = b.copy()
+    keys = list(map(key, b))
+    # Map each key to the index of its first item in b, so that matching is a
+    # dict lookup instead of a scan over b for every item in a. The mapping
+    # is built in one go by the dict constructor, walking b backwards so that
+    # the first index of duplicate keys remains
+    first_indices = dict(zip(reversed(keys), range(len(keys) - 1, -1, -1)))
+    if len(first_indices) == len(keys):
+        # All keys are unique, so each key matches at most once
+        pop_index = first_indices.pop
+        matches = [
+            None if (idx := pop_index(key(item), None)) is None else b[idx]
+            for item in a
+        ]
+        removals = [b[idx] for idx in sorted(first_indices.values())]
+        return matches, removals
+
+    # Otherwise (e.g. for multiple items without a key), map each key to all
+    # of its indices, in order
+    indices_by_key = {}
+    for idx, item_key in enumerate(keys):
+        indices_by_key.setdefault(item_key, deque()).append(idx)
+
+    matched = set()
     matches = []
     for item in a:
-        match_idx = indexOf(b, match, item)
-        if match_idx is not None:
-            matches.append(b.pop(match_idx))
+        indices = indices_by_key.get(key(item))
+        if indices:
+            idx = indices.popleft()
+            matched.add(idx)
+            matches.append(b[idx])
         else:
             # Add an 'insertion' point
             matches.append(None)
 
-    removals = b.copy()
+    removals = [item for idx, item in enumerate(b) if idx not in matched]
     return matches, removals
 
 
@@ -673,7 +892,7 @@ def apply_op(op: Dict, it: Iterable):
     if op["op"] is OpType.MOVE:
         idx = it.index(op["value"])
         val = it.pop(idx)
-        new_idx = it.index(op["anchor"])
+        new_idx = it.index(op["anchor"]) if "anchor" in op else len(it)
         it.insert(new_idx, val)
     elif op["op"] is OpType.DEL:
         it.remove(op["value"])
@@ -688,53 +907,108 @@ def create_operation(type, value, anchor: Any = None):
         Operation as a simple dict with the following keys:
         - op: type of operation: DEL, ADD or MOVE
         - value: value of the item
-        - anchor (required when type is MOVE): the element before
-            which this element should be inserted
+        - anchor (optional): the element before which this element should
+            be inserted. When there is no anchor, the element is placed at
+            the end.
     """
     result = {"op": type, "value": value}
     if anchor is not None:
         result["anchor"] = anchor
-    assert type is not OpType.MOVE or "anchor" in result
     return result
 
 
 def create_ops(current, future):
     """
     Args:
-        current: list of keys as they are currently rendered in the dom
-        future: list of keys as they should be rendered in the dom
+        current: list of (hashable) keys as they are currently rendered in the dom
+        future: list of (hashable) keys as they should be rendered in the dom
 
     Returns:
         list of operations to apply (in order) to convert `current` to
         `future`. See `create_operation` for more details.
+
+    After the deletions, the common prefix and suffix stay in place. Of the items
+    in between, the longest subsequence that is already in order stays in place
+    as well, so only the other items are moved (or added). Anchors are always
+    items that stay in place.
     """
-    ops = []
-    # Bookkeep the state of the array for intermediate states
-    wip = current.copy()
-
-    # First figure out all the deletions that need to take place
-    for old in current:
-        if old not in future:
-            ops.append(create_operation(OpType.DEL, value=old))
-            apply_op(ops[-1], wip)
-
-    # Then figure out all the movements and deletions
-    for idx, (old, new) in enumerate(zip_longest(current, future)):
-        if new is not None and new not in current:
-            anchor = wip[idx] if idx < len(wip) else None
-            ops.append(create_operation(OpType.ADD, value=new, anchor=anchor))
-            apply_op(ops[-1], wip)
-
-        if old is not None and new is None:
-            # The deletion ops have already been recorded
+    future_keys = set(future)
+    ops = [
+        create_operation(OpType.DEL, value=old)
+        for old in current
+        if old not in future_keys
+    ]
+
+    # Skip the common prefix and suffix
+    start = 0
+    end_current, end_future = len(current), len(future)
+    while (
+        start < end_current and start < end_future and current[start] == future[start]
+    ):
+        start += 1
+    while (
+        end_current > start
+        and end_future > start
+        and current[end_current - 1] == future[end_future - 1]
+    ):
+        end_current -= 1
+        end_future -= 1
+
+    middle = future[start:end_future]
+    if not middle:
+        return ops
+
+    # For each item in the middle of future, the index in current (or -1)
+    old_indices = {key: idx for idx, key in enumerate(current[start:end_current])}
+    sources = [old_indices.get(key, -1) for key in middle]
+    existing = [source for source in sources if source >= 0]
+    if existing == sorted(set(existing)):
+        # The existing items are already in (strictly increasing) order, e.g.
+        # when items are only added and/or removed, so all of them stay in
+        # place. This check runs in C, unlike the LIS.
+        in_place = {idx for idx, source in enumerate(sources) if source >= 0}
+    else:
+        in_place = longest_increasing_subsequence(sources)
+
+    # Walk backwards, so that the anchor is the next item that stays in place
+    anchor = future[end_future] if end_future < len(future) else None
+    middle_ops = []
+    for idx in range(len(middle) - 1, -1, -1):
+        key = middle[idx]
+        if idx in in_place:
+            anchor = key
             continue
+        op_type = OpType.ADD if sources[idx] < 0 else OpType.MOVE
+        middle_ops.append(create_operation(op_type, value=key, anchor=anchor))
+    ops.extend(reversed(middle_ops))
 
-        idx_before = wip.index(new)
+    return ops
 
-        if idx_before != idx:
-            # If an item is moved back, then the offset will be increased
-            anchor = wip[idx] if idx < len(wip) else None
-            ops.append(create_operation(OpType.MOVE, value=new, anchor=anchor))
-            apply_op(ops[-1], wip)
 
-    return ops
+def longest_increasing_subsequence(values: List[int]) -> Set[int]:
+    """Returns the indices of a longest strictly increasing subsequence of the
+    given values. Negative values are ignored."""
+    # tails[n] is the index of the smallest last value of all the increasing
+    # subsequences of length n + 1 that have been found so far
+    tails = []
+    tail_values = []
+    predecessors = [-1] * len(values)
+    for idx, value in enumerate(values):
+        if value < 0:
+            continue
+        pos = bisect_left(tail_values, value)
+        if pos:
+            predecessors[idx] = tails[pos - 1]
+        if pos == len(tails):
+            tails.append(idx)
+            tail_values.append(value)
+        else:
+            tails[pos] = idx
+            tail_values[pos] = value
+
+    result = set()
+    idx = tails[-1] if tails else -1
+    while idx >= 0:
+        result.add(idx)
+        idx = predecessors[idx]
+    return result
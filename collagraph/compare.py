@@ -1,4 +1,5 @@
 from functools import partial
+from types import MethodType
 from typing import Callable
 
 
@@ -8,6 +9,13 @@ def equivalent_functions(a: Callable, b: Callable):
     ``functools.partial`` functions are also supported (but only when both
     argument a and b are partial).
     """
+    if a is b:
+        return True
+    # Bound methods (e.g. `self.bump`) are new objects for every attribute
+    # lookup, but compare equal when bound to the same object and function
+    if a.__class__ is MethodType and b.__class__ is MethodType and a == b:
+        return True
+
     if not hasattr(a, "__code__") or not hasattr(b, "__code__"):
         if isinstance(a, partial) and isinstance(b, partial):
             return (
@@ -1,24 +1,69 @@
 from abc import abstractmethod
 from collections import defaultdict
+from copy import deepcopy
 from weakref import ref
 
 from observ import reactive, readonly
 
 from collagraph import render_slot
+from collagraph.types import BEFORE_UNMOUNT_HOOK, MOUNTED_HOOK, UPDATED_HOOK
 
+# Types of (default) values that are immutable, so those don't have to be copied
+IMMUTABLE_TYPES = frozenset({str, int, float, bool, type(None), tuple, frozenset})
 
-class Component:
-    """Abstract base class for components"""
 
-    __lookup_cache__ = defaultdict(dict)
+class Component:
+    """Abstract base class for components
+
+    The lifecycle hooks (`mounted`, `updated` and `before_unmount`) are only
+    called when they are overridden in the class body of a subclass (or in one
+    of its bases). Hooks that are assigned to the class or an instance after
+    the class has been created are not called.
+    """
+
+    __lookup_cache__ = {}
+    # Lifecycle hooks that are overridden by the class, so that the hooks
+    # that aren't overridden don't have to be called
+    __hooks__ = 0
+    # Optional mapping of names of state to their default values. The state is
+    # initialized from the props with the same names, or else from the default
+    # value. Mutable default values are (deep) copied, so that instances don't
+    # share those
+    state_defaults = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Each component class gets its own cache for `_lookup`, which is
+        # collected together with the class itself
+        cls.__lookup_cache__ = {}
+        cls.__hooks__ = (
+            (MOUNTED_HOOK if cls.mounted is not Component.mounted else 0)
+            | (UPDATED_HOOK if cls.updated is not Component.updated else 0)
+            | (
+                BEFORE_UNMOUNT_HOOK
+                if cls.before_unmount is not Component.before_unmount
+                else 0
+            )
+        )
 
     def __init__(self, props=None, parent=None):
         self._props = readonly({} if props is None else props)
-        self._state = reactive({})
+        state = {}
+        if defaults := self.state_defaults:
+            props = self._props
+            state = {}
+            for key, value in defaults.items():
+                if key in props:
+                    state[key] = props[key]
+                elif value.__class__ in IMMUTABLE_TYPES:
+                    state[key] = value
+                else:
+                    state[key] = deepcopy(value)
+        self._state = reactive(state)
         self._element = None
         self._slots = {}
         self._event_handlers = defaultdict(set)
-        self._lookup_cache = Component.__lookup_cache__[type(self)]
+        self._lookup_cache = type(self).__lookup_cache__
         self._parent = ref(parent) if parent else None
         self._provided = {}
 
@@ -103,6 +148,13 @@ class Component:
 
     @abstractmethod
     def render():  # pragma: no cover
+        """Returns the element (tree) of this component.
+
+        Called again whenever any of the state or props that it depends on
+        changes. For components that are defined in CGX files, this method is
+        generated from the template, in which case the elements and props that
+        consist of only constants are created just once per class.
+        """
         pass
 
     def provide(self, key: str, value):
@@ -120,7 +172,15 @@ class Component:
     def emit(self, event, *args, **kwargs):
         """Call event handlers for the given event. Any args and kwargs will be passed
         on to the registered handlers."""
-        for handler in self._event_handlers[event].copy():
+        if not (handlers := self._event_handlers.get(event)):
+            return
+        if len(handlers) == 1:
+            # Most events have a single handler, which can be called directly
+            (handler,) = handlers
+            handler(*args, **kwargs)
+            return
+        # Handlers might (un)register handlers, so iterate over a copy
+        for handler in handlers.copy():
             handler(*args, **kwargs)
 
     def add_event_handler(self, event, handler):
@@ -138,30 +198,41 @@ class Component:
         This provides some syntactic sugar so that users can leave out `self`,
         `self.state` and `self.props`.
         """
+        # NOTE: looking up props and state makes the render watcher depend on
+        # the looked up keys. Observ subscribes the watcher just once for each
+        # key per render, so a repeated lookup only costs the lookup itself
         cache = self._lookup_cache
-        if method := cache.get(name):
-            return method(self, name, context)
-
-        def props_lookup(self, name, context):
-            return self.props[name]
-
-        def state_lookup(self, name, context):
-            return self.state[name]
-
-        def self_lookup(self, name, context):
-            return getattr(self, name)
-
-        def global_lookup(self, name, context):
-            return context[name]
+        if binding := cache.get(name):
+            return binding(self, name, context)
 
+        # Record in which container the name is found, so that subsequent
+        # lookups take a single dict lookup and call
         if name in self.props:
-            cache[name] = props_lookup
+            binding = _lookup_props
         elif name in self.state:
-            cache[name] = state_lookup
+            binding = _lookup_state
         elif hasattr(self, name):
-            cache[name] = self_lookup
+            binding = _lookup_attribute
         elif name in context:
-            cache[name] = global_lookup
+            binding = _lookup_context
         else:
             raise NameError(f"name '{name}' is not defined")
-        return self._lookup(name, context)
+
+        cache[name] = binding
+        return binding(self, name, context)
+
+
+def _lookup_props(component, name, context):
+    return component.props[name]
+
+
+def _lookup_state(component, name, context):
+    return component.state[name]
+
+
+def _lookup_attribute(component, name, context):
+    return getattr(component, name)
+
+
+def _lookup_context(component, name, context):
+    return context[name]
@@ -1,5 +1,5 @@
 from abc import ABCMeta, abstractmethod
-from typing import Any, Callable, Optional
+from typing import Any, Callable, Dict, Optional
 
 from collagraph.types import EventLoopType
 
@@ -18,6 +18,22 @@ class Renderer(metaclass=ABCMeta):  # pragma: no cover
         """
         pass
 
+    def commit_begin(self, container: Any) -> None:
+        """
+        Called before DOM elements within `container` are inserted, moved or
+        removed for a render pass, so that the renderer can suspend its own
+        updates. Render passes that only update attributes are not bracketed
+        by `commit_begin` and `commit_end`.
+        """
+        pass
+
+    def commit_end(self, container: Any) -> None:
+        """
+        Called after DOM elements within `container` have been inserted, moved
+        or removed for a render pass (also when an error was raised).
+        """
+        pass
+
     @abstractmethod
     def create_element(self, type: str) -> Any:
         """Create an element for the given type."""
@@ -67,6 +83,18 @@ class Renderer(metaclass=ABCMeta):  # pragma: no cover
         """Remove event listener for `event_type` to the element `el`."""
         pass
 
+    def add_event_listeners(self, el: Any, events: Dict[str, Callable]):
+        """Add event listeners for all the event types in `events` to the
+        element `el`. Renderers can override this to add them in one go."""
+        for event_type, value in events.items():
+            self.add_event_listener(el, event_type, value)
+
+    def remove_event_listeners(self, el: Any, events: Dict[str, Callable]):
+        """Remove event listeners for all the event types in `events` from the
+        element `el`. Renderers can override this to remove them in one go."""
+        for event_type, value in events.items():
+            self.remove_event_listener(el, event_type, value)
+
 
 from .dict_renderer import DictRenderer  # noqa: I202
 
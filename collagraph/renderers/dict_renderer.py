@@ -21,12 +21,12 @@ class DictRenderer(Renderer):
 
     def insert(self, el, parent, anchor=None):
         children = parent.setdefault("children", [])
-        anchor_idx = children.index(anchor) if anchor else len(children)
+        anchor_idx = index_of(children, anchor) if anchor else len(children)
         children.insert(anchor_idx, el)
 
     def remove(self, el, parent):
         children = parent["children"]
-        children.remove(el)
+        del children[index_of(children, el)]
 
     def set_element_text(self, el: dict, value: str):
         el["text"] = value
@@ -48,3 +48,13 @@ class DictRenderer(Renderer):
         event_listeners = el.get("handlers", None)
         if event_listeners:
             event_listeners[event_type].remove(value)
+
+
+def index_of(children, el):
+    """Returns the index of `el` in `children`. Elements are dicts, so instead of
+    `list.index`, which compares (whole subtrees of) dicts for equality, this
+    looks for the very same object."""
+    for idx, child in enumerate(children):
+        if child is el:
+            return idx
+    raise ValueError(f"{el} is not in children")
@@ -4,6 +4,7 @@ from . import Renderer
 
 ELEMENT_TYPE_CACHE = {}
 DEFAULT_ATTR_CACHE = {}
+ATTR_PATH_CACHE = {}
 
 
 class PygfxRenderer(Renderer):
@@ -46,7 +47,7 @@ class PygfxRenderer(Renderer):
 
         # Split the given attr on dots to allow for
         # local.position for instance to be set
-        *attrs, attr = attr.split(".")
+        attrs, attr = split_attr(attr)
         for attribute in attrs:
             obj = getattr(obj, attribute)
 
@@ -65,7 +66,7 @@ class PygfxRenderer(Renderer):
 
         # Split the given attr on dots to allow for
         # local.position for instance to be set
-        *attrs, attr = attr.split(".")
+        attrs, attr = split_attr(attr)
         for attribute in attrs:
             obj = getattr(obj, attribute)
 
@@ -84,3 +85,30 @@ class PygfxRenderer(Renderer):
 
     def remove_event_listener(self, el, event_type, value):
         el.remove_event_handler(value, event_type)
+
+    def add_event_listeners(self, el, events):
+        # Pygfx accepts multiple event types per handler
+        for value, event_types in group_by_handler(events).items():
+            el.add_event_handler(value, *event_types)
+
+    def remove_event_listeners(self, el, events):
+        for value, event_types in group_by_handler(events).items():
+            el.remove_event_handler(value, *event_types)
+
+
+def group_by_handler(events):
+    """Returns a dict of handler to the list of event types for that handler."""
+    result = {}
+    for event_type, value in events.items():
+        result.setdefault(value, []).append(event_type)
+    return result
+
+
+def split_attr(attr):
+    """Returns the path of attributes to follow and the name of the final
+    attribute for the given (dotted) attr. Results are cached, because the
+    same attributes are set over and over again."""
+    if (result := ATTR_PATH_CACHE.get(attr)) is None:
+        *attrs, name = attr.split(".")
+        result = ATTR_PATH_CACHE[attr] = (tuple(attrs), name)
+    return result
@@ -87,9 +87,15 @@ class EventFilter(QtCore.QObject):
         self._event_handlers[event].remove(handler)
 
     def eventFilter(self, obj, event):  # noqa: N802
-        if handlers := self._event_handlers[event.type().name]:
-            for handler in handlers.copy():
+        # The filter sees all events of the object, most of which don't have
+        # handlers, so don't create empty sets for those
+        if handlers := self._event_handlers.get(event.type().name):
+            if len(handlers) == 1:
+                (handler,) = handlers
                 handler(event)
+            else:
+                for handler in handlers.copy():
+                    handler(event)
 
         return super().eventFilter(obj, event)
 
@@ -100,6 +106,8 @@ class PySideRenderer(Renderer):
     def __init__(self, autoshow=True):
         super().__init__()
         self.autoshow = autoshow
+        # Container of which the updates are suspended during a commit
+        self._suspended = None
 
     def preferred_event_loop_type(self):
         return EventLoopType.DEFAULT
@@ -248,6 +256,25 @@ class PySideRenderer(Renderer):
             SET_ATTR_MAPPING.append((t, func))
             SET_ATTR_MAPPING.sort(key=class_hierarchy)
 
+    def commit_begin(self, container: Any) -> None:
+        """Suspend the updates (painting) of the container while widgets
+        within it are inserted, moved or removed, so that it is repainted
+        only once afterwards.
+        Signals are not blocked, because event listeners depend on them."""
+        if (
+            isinstance(container, QtWidgets.QWidget)
+            and container.isVisible()
+            and container.updatesEnabled()
+        ):
+            container.setUpdatesEnabled(False)
+            self._suspended = container
+
+    def commit_end(self, container: Any) -> None:
+        """Resume the updates of the container, if those were suspended."""
+        if self._suspended is container:
+            self._suspended = None
+            container.setUpdatesEnabled(True)
+
     def create_element(self, type_name: str) -> Any:
         """Create an element for the given type."""
         # Make sure that an app exists before any widgets
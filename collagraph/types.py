@@ -1,8 +1,14 @@
-from dataclasses import dataclass
 from enum import Enum
 from typing import Any, Callable, Dict, List, Union
 
 
+# Flags for the lifecycle hooks that a component class overrides, which are
+# combined in the `__hooks__` attribute of the class
+MOUNTED_HOOK = 1
+UPDATED_HOOK = 2
+BEFORE_UNMOUNT_HOOK = 4
+
+
 class EventLoopType(Enum):
     DEFAULT = "asyncio"
     SYNC = "sync"
@@ -22,35 +28,124 @@ class OpType(Enum):
     ADD = "ADD"
 
 
-@dataclass
 class VNode:
-    """Virtual Node that serves as a basic description of the node to be rendered."""
+    """Virtual Node that serves as a basic description of the node to be rendered.
+
+    A VNode is created for every element on every render, so this uses
+    __slots__ like Fiber. It behaves like the dataclass it replaces: it
+    compares by value and is not hashable.
+    """
+
+    __slots__ = ("type", "props", "children", "key")
+
+    def __init__(
+        self,
+        type: Union[str, Callable],
+        props: Dict,
+        children: Union[List["VNode"], Dict[str, Callable]],
+        key: str = None,
+    ):
+        self.type = type
+        self.props = props
+        self.children = children
+        self.key = key
+
+    def __repr__(self):
+        return (
+            f"VNode(type={self.type!r}, props={self.props!r}, "
+            f"children={self.children!r}, key={self.key!r})"
+        )
 
-    type: Union[str, Callable]
-    props: Dict
-    children: Union[List["VNode"], Dict[str, Callable]]
-    key: str = None
+    def __eq__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return (self.type, self.props, self.children, self.key) == (
+            other.type,
+            other.props,
+            other.children,
+            other.key,
+        )
+
+    __hash__ = None
 
 
-@dataclass
 class Fiber:
-    """Fibers hold information/work about a VNode and a 'dom' element."""
-
-    alternate: "Fiber" = None
-    child: "Fiber" = None
-    children: List["VNode"] = None
-    dom: Any = None
-    effect_tag: EffectTag = None
-    key: str = None
-    anchor: Any = None  # Dom element
-    move: bool = False
-    parent: "Fiber" = None
-    props: Dict = None
-    sibling: "Fiber" = None
-    snapshot: Dict = None
-    type: Union[str, Callable] = None
-    watcher: Any = None
-    component: Any = None  # Component instance
-    mounted: bool = False  # Flag for components whether it was mounted
-    updated: bool = False  # Flag for components whether any DOM was updated
-    unmounted: bool = False  # Flag for components whether it was unmounted
+    """Fibers hold information/work about a VNode and a 'dom' element.
+
+    Fibers are created and updated for every element on every render, so
+    this is a plain class with __slots__ instead of a dataclass. That makes
+    attribute access cheaper and fibers smaller. Fibers compare by identity.
+    """
+
+    __slots__ = (
+        "alternate",
+        "child",
+        "children",
+        "dom",
+        "dom_parent",  # Dom element of the closest ancestor with a dom element
+        "effect_tag",
+        "key",
+        "anchor",  # Dom element
+        "move",
+        "parent",
+        "props",
+        "props_snapshot",  # Raw copy of the props, to diff against
+        "sibling",
+        "snapshot",
+        "type",
+        "watcher",
+        "component",  # Component instance
+        "mounted",  # Flag for components whether it was mounted
+        "updated",  # Flag for components whether any DOM was updated
+        "unmounted",  # Flag for components whether it was unmounted
+    )
+
+    def __init__(
+        self,
+        alternate: "Fiber" = None,
+        child: "Fiber" = None,
+        children: List["VNode"] = None,
+        dom: Any = None,
+        dom_parent: Any = None,
+        effect_tag: EffectTag = None,
+        key: str = None,
+        anchor: Any = None,
+        move: bool = False,
+        parent: "Fiber" = None,
+        props: Dict = None,
+        props_snapshot: Dict = None,
+        sibling: "Fiber" = None,
+        snapshot: Dict = None,
+        type: Union[str, Callable] = None,
+        watcher: Any = None,
+        component: Any = None,
+        mounted: bool = False,
+        updated: bool = False,
+        unmounted: bool = False,
+    ):
+        self.alternate = alternate
+        self.child = child
+        self.children = children
+        self.dom = dom
+        self.dom_parent = dom_parent
+        self.effect_tag = effect_tag
+        self.key = key
+        self.anchor = anchor
+        self.move = move
+        self.parent = parent
+        self.props = props
+        self.props_snapshot = props_snapshot
+        self.sibling = sibling
+        self.snapshot = snapshot
+        self.type = type
+        self.watcher = watcher
+        self.component = component
+        self.mounted = mounted
+        self.updated = updated
+        self.unmounted = unmounted
+
+    def __repr__(self):
+        return (
+            f"Fiber(type={self.type!r}, key={self.key!r}, "
+            f"effect_tag={self.effect_tag})"
+        )
@@ -1,4 +1,10 @@
+import textwrap
+
+from observ.traps import ReadonlyError
+import pytest
+
 import collagraph as cg
+from collagraph.cgx.cgx import load_from_string
 
 
 def test_cgx_use_imported_component():
@@ -26,3 +32,151 @@ def test_cgx_use_imported_func_component():
     assert len(content["children"]) == 6
     for idx, child in enumerate(content["children"]):
         assert child["type"] == "example-func-component", f"Child at {idx}: {child}"
+
+
+def test_cgx_constant_props_are_hoisted():
+    Parent, _ = load_from_string(
+        textwrap.dedent(
+            """
+            <template>
+              <parent title="Parent">
+                <Child title="Child" />
+              </parent>
+            </template>
+
+            <script>
+            import collagraph as cg
+
+            class Child(cg.Component):
+                def render(self):
+                    return cg.h("child")
+
+            class Parent(cg.Component):
+                pass
+            </script>
+            """
+        )
+    )
+
+    parent = Parent()
+    first, second = parent.render(), parent.render()
+
+    # Constant props of DOM elements are shared between renders
+    assert first.props == {"title": "Parent"}
+    assert first.props.target is second.props.target
+    # Components get their own copy, because their props are updated in place
+    child_first, child_second = first.children[0], second.children[0]
+    assert child_first.props == {"title": "Child"}
+    assert child_first.props.target is not child_second.props.target
+
+
+def test_cgx_static_elements_are_hoisted():
+    Parent, _ = load_from_string(
+        textwrap.dedent(
+            """
+            <template>
+              <parent :title="title">
+                <header title="Header">
+                  <label text="Static" />
+                  Text
+                </header>
+                <label :text="title" />
+              </parent>
+            </template>
+
+            <script>
+            import collagraph as cg
+
+            class Parent(cg.Component):
+                title = "Parent"
+            </script>
+            """
+        )
+    )
+
+    first, second = Parent().render(), Parent().render()
+
+    # Elements with only constant props and children are shared
+    assert first is not second
+    header = first.children[0]
+    assert header.type == "header"
+    assert header.props == {"title": "Header"}
+    assert header.children[0].props == {"text": "Static"}
+    assert header is second.children[0]
+    # Elements with bound props are created on every render
+    assert first.children[1].props == {"text": "Parent"}
+
+
+def test_cgx_hoisted_elements_are_read_only():
+    Box, _ = load_from_string(
+        textwrap.dedent(
+            """
+            <template>
+              <box a="1">
+                <item b="2" />
+                <item b="3" />
+              </box>
+            </template>
+
+            <script>
+            import collagraph as cg
+
+            class Box(cg.Component):
+                pass
+            </script>
+            """
+        )
+    )
+
+    first, second = Box({}).render(), Box({}).render()
+    assert first is second
+
+    # Mutating the shared element of one render would affect all others
+    with pytest.raises(ReadonlyError):
+        first.props["a"] = "mutated"
+    with pytest.raises(ReadonlyError):
+        first.children[0].props["b"] = "mutated"
+    with pytest.raises(AttributeError):
+        first.children.append(first.children[0])
+
+    assert second.props == {"a": "1"}
+    assert [child.props["b"] for child in second.children] == ["2", "3"]
+
+
+def test_cgx_host_elements_match_create_element():
+    Items, _ = load_from_string(
+        textwrap.dedent(
+            """
+            <template>
+              <items :title="title">Items: {{ len(items) }}<item
+                  v-for="item in items" :key="item" :text="item"
+                /><footer>Last:<label v-if="items" :text="items[-1]" /></footer>
+              </items>
+            </template>
+
+            <script>
+            import collagraph as cg
+
+            class Items(cg.Component):
+                title = "Items"
+                items = ["a", "b"]
+            </script>
+            """
+        )
+    )
+
+    def render(element):
+        container = {"type": "root"}
+        gui = cg.Collagraph(cg.DictRenderer(), event_loop_type=cg.EventLoopType.SYNC)
+        gui.render(element, container)
+        return container
+
+    assert render(cg.h(Items)) == render(
+        cg.h(
+            "items",
+            {"title": "Items"},
+            "Items: 2",
+            *[cg.h("item", {"key": item, "text": item}) for item in ["a", "b"]],
+            cg.h("footer", {}, "Last:", cg.h("label", {"text": "b"})),
+        )
+    )
@@ -1,6 +1,15 @@
+import importlib
+import os
+from pathlib import Path
+import sys
+
 import pytest
 
 import collagraph as cg
+from collagraph.cgx import cgx
+
+
+DATA_PATH = Path(__file__).parent.parent / "data"
 
 
 def test_cgx_import():
@@ -30,3 +39,73 @@ def test_cgx_no_component_class():
 def test_cgx_multiple_root_elements():
     with pytest.raises(ValueError):
         import tests.data.multiple_root_elements  # noqa: F401
+
+
+def test_cgx_load_cache(tmp_path):
+    path = tmp_path / "simple.cgx"
+    path.write_text((DATA_PATH / "simple.cgx").read_text())
+
+    cgx.load.cache_clear()
+    first, _ = cgx.load(path)
+    second, _ = cgx.load(path)
+    assert first is second
+
+    # Changing the modification time of the file invalidates the cache
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    third, _ = cgx.load(path)
+    assert third is not first
+    assert third.__name__ == "Simple"
+
+
+def test_cgx_code_cache(tmp_path, monkeypatch):
+    path = tmp_path / "simple.cgx"
+    path.write_text((DATA_PATH / "simple.cgx").read_text())
+    monkeypatch.setattr(cgx, "CGX_CACHE_DIR", tmp_path / "cache")
+    monkeypatch.setattr(sys, "dont_write_bytecode", False)
+
+    cgx.load.cache_clear()
+    first, _ = cgx.load(path)
+    assert cgx._code_cache_path(path).exists()
+
+    # A second load uses the cached code, instead of compiling the file again
+    def fail(*args, **kwargs):
+        raise AssertionError("CGX file should not be compiled")
+
+    monkeypatch.setattr(cgx, "construct_ast", fail)
+    cgx.load.cache_clear()
+    second, _ = cgx.load(path)
+    assert second is not first
+    assert second.__name__ == "Simple"
+    assert second({}).render().props["text"] == "Simple"
+
+    # Changing the settings that influence code generation invalidates the cache
+    monkeypatch.setattr(cgx, "CGX_RUNTIME_WARNINGS", not cgx.CGX_RUNTIME_WARNINGS)
+    cgx.load.cache_clear()
+    with pytest.raises(AssertionError):
+        cgx.load(path)
+
+
+def test_cgx_import_under_two_names(monkeypatch):
+    import tests.data.simple as first
+
+    monkeypatch.syspath_prepend(str(DATA_PATH))
+    monkeypatch.delitem(sys.modules, "simple", raising=False)
+    try:
+        second = importlib.import_module("simple")
+    finally:
+        sys.modules.pop("simple", None)
+
+    assert first.__name__ == "tests.data.simple"
+    assert second.__name__ == "simple"
+    # Every module gets its own component class, of which the
+    # globals are the namespace of that module
+    assert first.Simple is not second.Simple
+    assert first.Simple.render.__globals__["__name__"] == "tests.data.simple"
+    assert second.Simple.render.__globals__["__name__"] == "simple"
+
+    # Importing the file doesn't modify the globals of the loaded component
+    component, namespace = cgx.load(DATA_PATH / "simple.cgx")
+    assert "__spec__" not in component.render.__globals__
+    namespace["__spec__"] = None
+    assert "__spec__" not in cgx.load(DATA_PATH / "simple.cgx")[1]
@@ -0,0 +1,92 @@
+import pytest
+
+from collagraph.cgx.cgx import CGXParser, Comment, Element, TextElement
+
+
+def test_cgx_parser():
+    parser = CGXParser()
+    parser.feed(
+        "<template>\n"
+        "  <Item a=\"x > y\" b='&amp;' c=d flag/>\n"
+        "  <!-- comment -->\n"
+        "  {{ a < b }}\n"
+        "</template>\n"
+        "<script>\n"
+        'if a < b and "</template>":\n'
+        "    pass\n"
+        "</script>\n"
+    )
+
+    template, script = parser.root.children
+    assert template.tag == "template"
+    assert template.location == (1, 0)
+    assert template.end == (5, 0)
+
+    item, comment, text = template.children
+    assert isinstance(item, Element)
+    # The original casing of the tag is kept
+    assert item.tag == "Item"
+    assert item.attrs == {"a": "x > y", "b": "&", "c": "d", "flag": True}
+    assert item.location == item.end == (2, 2)
+
+    assert isinstance(comment, Comment)
+    assert comment.content == " comment "
+    assert comment.location == (3, 2)
+
+    assert isinstance(text, TextElement)
+    assert text.content.strip() == "{{ a < b }}"
+
+    # The content of the script tag is not parsed
+    assert script.location == (6, 0)
+    assert script.end == (9, 0)
+    (content,) = script.children
+    assert content.content == '\nif a < b and "</template>":\n    pass\n'
+
+
+def test_cgx_parser_self_closing_bare_value():
+    parser = CGXParser()
+    parser.feed("<a b=x/><c d=e/f g=h /><i/>")
+
+    a, c, i = parser.root.children
+    # The '/' of a self-closing tag is not part of an unquoted value
+    assert a.attrs == {"b": "x"}
+    assert not a.children
+    assert c.attrs == {"d": "e/f", "g": "h"}
+    assert not c.children
+    assert i.tag == "i"
+
+
+def test_cgx_parser_self_closing_whitespace():
+    parser = CGXParser()
+    parser.feed('<a/ ><b c="x" / >')
+
+    a, b = parser.root.children
+    assert a.tag == "a"
+    assert b.attrs == {"c": "x"}
+    assert not a.children and not b.children
+
+
+@pytest.mark.parametrize(
+    "template",
+    [
+        "<t x=/>",
+        "<t =a>",
+        '<t a== "1">',
+        '<t a="oops>',
+        '<t a="oops',
+        "<t a='oops",
+        "<p>\n  <t",
+    ],
+)
+def test_cgx_parser_invalid_tag(template):
+    parser = CGXParser()
+    with pytest.raises(ValueError, match="Invalid tag"):
+        parser.feed(template)
+
+
+def test_cgx_slot_directives():
+    assert Element("t", {"v-slot": True}).slot_names == ["default"]
+    assert Element("t", {"v-slot:header": True}).slot_names == ["header"]
+    assert Element("t", {"#footer": True}).slot_names == ["footer"]
+    # A typo is not mistaken for a slot
+    assert Element("t", {"v-slotfoo": True}).slot_names == []
@@ -1,5 +1,13 @@
+import ast
+from pathlib import Path
+
 from observ import reactive
 
+from collagraph.cgx import cgx
+
+
+DATA_PATH = Path(__file__).parent.parent / "data"
+
 
 def test_resolve_names():
     from tests.data.resolve_names import Example
@@ -37,3 +45,26 @@ def test_cgx_file_dunder():
 
     package = example.package()
     assert package == "tests.data"
+
+
+def test_resolve_module_level_names():
+    from tests.data.module_names import Example
+
+    example = Example()
+    root = example.render()
+
+    values = [item.props["value"] for item in root.children]
+    assert values == ["hello", "HELLO", "a", "b"]
+
+
+def test_module_level_names_skip_lookup():
+    tree, _ = cgx.construct_ast(DATA_PATH / "module_names.cgx")
+
+    looked_up = {
+        node.args[0].value
+        for node in ast.walk(tree)
+        if isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Name)
+        and node.func.id == cgx.LOOKUP_NAME
+    }
+    assert not looked_up & {"GREETING", "LABELS", "shout"}
@@ -323,3 +323,18 @@ def test_directive_boolean_casting():
     label = node.children[0]
     assert "disabled" in label.props
     assert label.props["disabled"] is True
+
+
+def test_directive_if_constant():
+    from tests.data.directive_if_constant import Label
+
+    component = Label({"foo": False})
+    node = component.render()
+
+    # The False and 0 branches are dropped and True ends the chain
+    assert [child.props["text"] for child in node.children] == ["Always", "One"]
+
+    component = Label({"foo": True})
+    node = component.render()
+
+    assert [child.props["text"] for child in node.children] == ["Foo", "One"]
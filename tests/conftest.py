@@ -22,3 +22,15 @@ def process_events():
         loop.run_until_complete(miniloop())
 
     yield run
+
+
+@pytest.fixture(autouse=True)
+def cgx_cache(tmp_path, monkeypatch):
+    # Don't write compiled CGX code in the cache dir of the user and
+    # start every test with a clean cache of loaded CGX files
+    from collagraph.cgx import cgx
+
+    monkeypatch.setattr(cgx, "CGX_CACHE_DIR", tmp_path / "cgx-cache")
+    cgx.load.cache_clear()
+    yield
+    cgx.load.cache_clear()
@@ -246,3 +246,54 @@ def test_is_new_no_type_error(qapp):
 
     # Resetting the flags property to None should also not result in a TypeError
     state["flags"] = None
+
+
+def test_updates_suspended_during_commit(qtbot):
+    updates_enabled = []
+    inserted = []
+
+    class Renderer(cg.PySideRenderer):
+        def insert(self, el, parent, anchor=None):
+            inserted.append(container.updatesEnabled())
+            super().insert(el, parent, anchor=anchor)
+
+        def set_attribute(self, obj, attr, value):
+            updates_enabled.append(container.updatesEnabled())
+            super().set_attribute(obj, attr, value)
+
+    renderer = Renderer(autoshow=False)
+    gui = cg.Collagraph(renderer=renderer, event_loop_type=cg.EventLoopType.SYNC)
+    container = renderer.create_element("Widget")
+    qtbot.addWidget(container)
+    container.show()
+
+    state = reactive({"text": "Foo", "items": []})
+
+    def App(props):
+        return cg.h(
+            "Widget",
+            {"layout": {"type": "Box"}},
+            cg.h("Label", {"text": props["text"]}),
+            *[cg.h("Label", {"text": item, "key": item}) for item in props["items"]],
+        )
+
+    gui.render(cg.h(App, state), container)
+    assert container.updatesEnabled()
+
+    # Updating only attributes doesn't suspend the updates, because
+    # resuming the updates repaints the whole container
+    updates_enabled.clear()
+    state["text"] = "Bar"
+
+    label = container.findChild(QtWidgets.QLabel)
+    assert label.text() == "Bar"
+    assert updates_enabled == [True]
+    assert container.updatesEnabled()
+
+    # Inserting widgets does suspend the updates
+    inserted.clear()
+    state["items"] = ["Baz"]
+
+    assert len(container.findChildren(QtWidgets.QLabel)) == 2
+    assert inserted == [False]
+    assert container.updatesEnabled()
@@ -1,4 +1,5 @@
 from observ import reactive
+from observ.traps import ReadonlyError
 import pytest
 
 from collagraph import Collagraph, Component, create_element as h, EventLoopType
@@ -14,6 +15,25 @@ def test_basic_dict_renderer():
     assert container["children"][0] == {"type": "app"}
 
 
+def test_dict_renderer_insert_remove_by_identity():
+    renderer = DictRenderer()
+    parent = renderer.create_element("parent")
+    first, second, third = [renderer.create_element("item") for _ in range(3)]
+
+    renderer.insert(first, parent)
+    renderer.insert(second, parent)
+    # Equal to both other items, but should be inserted before second
+    renderer.insert(third, parent, anchor=second)
+    assert [id(el) for el in parent["children"]] == [
+        id(first),
+        id(third),
+        id(second),
+    ]
+
+    renderer.remove(second, parent)
+    assert [id(el) for el in parent["children"]] == [id(first), id(third)]
+
+
 def test_renderer_required():
     # renderer argument is required
     with pytest.raises(TypeError):
@@ -257,6 +277,27 @@ def test_yield_if_time_is_up_for_lots_of_work(process_events):
     assert len(container["children"][0]["children"]) == 1000
 
 
+def test_reschedule_work_if_deadline_passed(process_events):
+    gui = Collagraph(DictRenderer())
+    container = {"type": "root"}
+
+    gui.render(h("app", {}, h("node")), container)
+    root = gui._next_unit_of_work
+
+    # Starting after the deadline should not perform any work
+    gui.work_loop(deadline=0)
+    assert gui._next_unit_of_work is root
+
+    # But it should not do so twice in a row
+    gui.work_loop(deadline=0)
+    assert gui._next_unit_of_work is not root
+
+    while gui._wip_root is not None:
+        process_events()
+
+    assert len(container["children"][0]["children"]) == 1
+
+
 def test_add_remove_event_handlers(process_events):
     def Counter(props):
         def reset():
@@ -368,6 +409,103 @@ def test_only_render_on_relevant_change():
     assert rendered == 3
 
 
+def test_state_changes_are_batched(process_events):
+    rendered = 0
+
+    def Foo(props):
+        nonlocal rendered
+        rendered += 1
+        return h("foo", {"foo": props["foo"]})
+
+    gui = Collagraph(DictRenderer())
+    container = {"type": "root"}
+    state = reactive({"foo": 0})
+    gui.render(h(Foo, state), container)
+    process_events()
+
+    assert rendered == 1
+
+    for i in range(1, 6):
+        state["foo"] = i
+
+    process_events()
+
+    assert rendered == 2
+    assert container["children"][0]["attrs"]["foo"] == 5
+
+
+def test_mounted_components_render_once(process_events):
+    rendered = {"parent": 0, "child": 0}
+
+    class Child(Component):
+        def render(self):
+            rendered["child"] += 1
+            return h("child", {"value": self.props["state"]["value"]})
+
+    class Parent(Component):
+        def render(self):
+            rendered["parent"] += 1
+            return h(
+                "parent",
+                {"value": self.props["state"]["value"]},
+                h(Child, {"state": self.props["state"]}),
+                h(Child, {"state": self.props["state"]}),
+            )
+
+    gui = Collagraph(DictRenderer())
+    container = {"type": "root"}
+    state = reactive({"value": 0})
+    gui.render(h(Parent, {"state": state}), container)
+    process_events()
+
+    # Mounting the components should not trigger another render pass
+    assert rendered == {"parent": 1, "child": 2}
+
+    for i in range(1, 6):
+        state["value"] = i
+
+    process_events()
+
+    parent = container["children"][0]
+    assert parent["attrs"]["value"] == 5
+    assert [child["attrs"]["value"] for child in parent["children"]] == [5, 5]
+
+
+def test_reused_child_elements_are_not_updated():
+    updated = []
+
+    class Renderer(DictRenderer):
+        def set_attribute(self, obj, attr, value):
+            updated.append((obj["type"], attr))
+            super().set_attribute(obj, attr, value)
+
+    class Parent(Component):
+        _subs = None
+
+        def render(self):
+            # Rebuild the child elements only when the subs are replaced
+            if (subs := self.props["subs"]) is not self._subs:
+                self._subs = subs
+                self._children = [h("sub", {"data": sub}) for sub in subs]
+            return h("parent", {"count": self.state.get("count", 0)}, *self._children)
+
+    gui = Collagraph(Renderer(), event_loop_type=EventLoopType.SYNC)
+    container = {"type": "root"}
+    state = reactive({"subs": [[1], [2]]})
+    gui.render(h(Parent, state), container)
+    parent = gui._current_root.child.component
+
+    updated.clear()
+    parent.state["count"] = 1
+
+    # Only the parent element is updated
+    assert updated == [("parent", "count")]
+    assert [sub["attrs"]["data"] for sub in container["children"][0]["children"]] == [
+        [1],
+        [2],
+    ]
+
+
 def test_only_render_on_relevant_change_component():
     rendered = 0
 
@@ -411,3 +549,29 @@ def test_text_elements():
     text_node = div["children"][0]
     assert text_node["type"] == "TEXT_ELEMENT"
     assert text_node["text"] == "foo"
+
+
+def test_leaf_element_props_are_shared():
+    first = h("item", {"a": 1, "b": "b"})
+    second = h("item", {"a": 1, "b": "b"})
+    assert first is not second
+    assert first.props is second.props
+    # Props order, values and value types all matter
+    assert first.props is not h("item", {"b": "b", "a": 1}).props
+    assert h("item", {"a": 1}).props is not h("item", {"a": 2}).props
+    assert h("item", {"a": 1}).props is not h("item", {"a": True}).props
+    assert h("item", {"a": 1}).props is not h("item", {"a": 1.0}).props
+    # Equal floats can still differ, so those are not shared
+    assert str(h("item", {"a": 0.0}).props["a"]) == "0.0"
+    assert str(h("item", {"a": -0.0}).props["a"]) == "-0.0"
+
+    # The shared props are read-only
+    with pytest.raises(ReadonlyError):
+        first.props["a"] = 2
+    assert second.props["a"] == 1
+
+    # Elements with non-scalar props, children or reactive props are not shared
+    assert h("item", {"a": [1]}).props is not h("item", {"a": [1]}).props
+    assert h("item", {}, h("child")).props is not h("item", {}, h("child")).props
+    state = reactive({"a": 1})
+    assert h("item", state).props is state
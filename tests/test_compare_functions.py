@@ -127,3 +127,20 @@ def test_similar_lambda_function_which_captures_other_function():
     assert equivalent_functions(x, y)
     assert not equivalent_functions(x, z)
     assert not equivalent_functions(y, z)
+
+
+def test_bound_methods():
+    class Counter:
+        count = 0
+
+        def bump(self):
+            self.count += 1
+
+        def reset(self):
+            self.count = 0
+
+    counter = Counter()
+
+    assert counter.bump is not counter.bump
+    assert equivalent_functions(counter.bump, counter.bump)
+    assert not equivalent_functions(counter.bump, counter.reset)
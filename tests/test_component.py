@@ -1,3 +1,6 @@
+import gc
+import weakref
+
 from observ import reactive
 import pytest
 
@@ -8,6 +11,7 @@ from collagraph import (
     DictRenderer,
     EventLoopType,
 )
+from collagraph.types import BEFORE_UNMOUNT_HOOK, MOUNTED_HOOK, UPDATED_HOOK
 
 
 class Counter(Component):
@@ -36,6 +40,81 @@ def test_component_class():
     assert counter.state["count"] == 1
 
 
+def test_component_state_defaults():
+    class DefaultsCounter(Component):
+        state_defaults = {"count": 0, "step_size": 1}
+
+        bump = Counter.bump
+        render = Counter.render
+
+    counter = DefaultsCounter({"step_size": 2})
+
+    assert counter.state == {"count": 0, "step_size": 2}
+
+    counter.bump()
+
+    assert counter.state["count"] == 2
+    # The props are left alone
+    assert counter.props == {"step_size": 2}
+
+
+def test_component_state_defaults_not_shared():
+    class Items(Component):
+        state_defaults = {"items": []}
+
+        def render(self):
+            return h("items", {})
+
+    first = Items()
+    second = Items()
+    first.state["items"].append(1)
+
+    assert first.state["items"] == [1]
+    assert second.state["items"] == []
+    assert Items.state_defaults == {"items": []}
+
+
+def test_component_overridden_hooks():
+    class Mounted(Counter):
+        def mounted(self):
+            pass
+
+    class Unmounted(Mounted):
+        def before_unmount(self):
+            pass
+
+    assert Counter.__hooks__ == 0
+    assert Mounted.__hooks__ == MOUNTED_HOOK
+    assert Unmounted.__hooks__ == MOUNTED_HOOK | BEFORE_UNMOUNT_HOOK
+    assert not Unmounted.__hooks__ & UPDATED_HOOK
+
+
+def test_component_hooks_assigned_later_are_not_called():
+    mounted = []
+
+    class Item(Component):
+        def render(self):
+            return h("item", {})
+
+    # Hooks are found when the class is created, so hooks that are
+    # assigned later on are not called
+    Item.mounted = lambda self: mounted.append(self)
+    assert Item.__hooks__ == 0
+
+    gui = Collagraph(DictRenderer(), event_loop_type=EventLoopType.SYNC)
+    gui.render(h(Item, {}), {"type": "root"})
+    assert mounted == []
+
+    # A subclass does pick up the hooks of its bases
+    class SubItem(Item):
+        pass
+
+    assert SubItem.__hooks__ == MOUNTED_HOOK
+    gui = Collagraph(DictRenderer(), event_loop_type=EventLoopType.SYNC)
+    gui.render(h(SubItem, {}), {"type": "root"})
+    assert len(mounted) == 1
+
+
 def test_component_events():
     gui = Collagraph(DictRenderer(), event_loop_type=EventLoopType.SYNC)
     container = {"type": "root"}
@@ -221,6 +300,46 @@ def test_component_props_update():
     assert container["children"][0]["attrs"]["prop"] is True
 
 
+def test_component_only_renders_on_relevant_change():
+    class Child(Component):
+        renders = 0
+
+        def render(self):
+            Child.renders += 1
+            return h("child", {"value": self.props["value"]})
+
+    class Parent(Component):
+        renders = 0
+
+        def render(self):
+            Parent.renders += 1
+            return h(
+                "parent",
+                {"other": self.props["other"]},
+                h(Child, {"value": self.props["value"]}),
+            )
+
+    state = reactive({"value": 0, "other": 0})
+
+    gui = Collagraph(DictRenderer(), event_loop_type=EventLoopType.SYNC)
+    container = {"type": "root"}
+    gui.render(h(Parent, state), container)
+
+    assert (Parent.renders, Child.renders) == (1, 1)
+
+    # The child doesn't depend on 'other', so it doesn't need to be rendered
+    state["other"] = 1
+
+    assert (Parent.renders, Child.renders) == (2, 1)
+
+    state["value"] = 1
+
+    assert Parent.renders == 3
+    assert Child.renders == 2
+    child = container["children"][0]["children"][0]
+    assert child["attrs"]["value"] == 1
+
+
 def test_component_props_update_elaborate():
     """
     Test that 'computed' values are updated on the component.
@@ -351,6 +470,45 @@ def test_component_element():
     assert component.element is container["children"][0]
 
 
+def test_component_element_released_on_unmount():
+    component = None
+    element_before_unmount = None
+
+    class Child(Component):
+        def mounted(self):
+            nonlocal component
+            component = self
+
+        def before_unmount(self):
+            nonlocal element_before_unmount
+            element_before_unmount = self.element
+
+        def bump(self):
+            pass
+
+        def render(self):
+            return h("child", {"on_bump": self.bump})
+
+    def Parent(props):
+        return h("parent", {}, *([h(Child)] if props["show"] else []))
+
+    gui = Collagraph(DictRenderer(), event_loop_type=EventLoopType.SYNC)
+    container = {"type": "root"}
+    state = reactive({"show": True})
+    gui.render(h(Parent, state), container)
+
+    child_dom = container["children"][0]["children"][0]
+    assert component.element is child_dom
+
+    state["show"] = False
+
+    # The element is available in before_unmount but released afterwards, so
+    # that the component and its (event handlers of the) element don't form
+    # a reference cycle
+    assert element_before_unmount is child_dom
+    assert component.element is None
+
+
 def test_component_overwrite_attributes():
     class OverwriteState(Component):
         def __init__(self, *args, **kwargs):
@@ -395,3 +553,64 @@ def test_component_overwrite_attributes():
 
     with pytest.raises(RuntimeError):
         _ = OverwriteProps({})
+
+
+def test_component_lookup_cache():
+    class First(Component):
+        def render(self):
+            return h("first")
+
+    class Second(First):
+        count = 1
+
+    first = First({"count": 1})
+    second = Second({})
+    assert first._lookup("count", {}) == 1
+    assert second._lookup("count", {}) == 1
+
+    # Every component class has its own lookup cache
+    assert First.__lookup_cache__ is not Second.__lookup_cache__
+    assert Second.__lookup_cache__ is not Component.__lookup_cache__
+
+    # The cache does not keep the component class alive
+    ref = weakref.ref(Second)
+    del second, Second
+    gc.collect()
+    assert ref() is None
+
+
+def test_component_deleted_without_cycle_collector():
+    refs = []
+
+    class Item(Component):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            refs.append(weakref.ref(self))
+
+        def render(self):
+            return h("item", {"value": self.props["value"]})
+
+    def Items(props):
+        return h(
+            "items",
+            {},
+            *[h(Item, {"value": value, "key": value}) for value in props["items"]],
+        )
+
+    gui = Collagraph(DictRenderer(), event_loop_type=EventLoopType.SYNC)
+    container = {"type": "root"}
+    state = reactive({"items": [1, 2, 3]})
+    gui.render(h(Items, state), container)
+
+    gc.collect()
+    gc.disable()
+    try:
+        state["items"] = [1]
+        # The mounted component stays alive, the last deleted component is
+        # cleaned up by reference counting alone (the first deleted one is
+        # still referenced from the previous fiber tree)
+        assert refs[0]() is not None
+        assert refs[1]() is not None
+        assert refs[2]() is None
+    finally:
+        gc.enable()
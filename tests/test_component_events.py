@@ -75,3 +75,35 @@ def test_components_events():
         handler()
 
     assert counter == 5
+
+
+def test_component_emit_handlers_that_unregister():
+    class Emitter(cg.Component):
+        def render(self):
+            return cg.h("emitter")
+
+    calls = []
+    emitter = Emitter()
+
+    def once(value):
+        calls.append(("once", value))
+        emitter.remove_event_handler("changed", once)
+
+    def always(value):
+        calls.append(("always", value))
+
+    # Emitting an event without handlers does nothing
+    emitter.emit("changed", 0)
+    assert "changed" not in emitter._event_handlers
+
+    emitter.add_event_handler("changed", once)
+    emitter.emit("changed", 1)
+    emitter.emit("changed", 2)
+    assert calls == [("once", 1)]
+
+    calls.clear()
+    emitter.add_event_handler("changed", once)
+    emitter.add_event_handler("changed", always)
+    emitter.emit("changed", 3)
+    emitter.emit("changed", 4)
+    assert sorted(calls) == [("always", 3), ("always", 4), ("once", 3)]
@@ -163,3 +163,32 @@ def test_event_handlers():
     obj.handle_event(event)
 
     assert count == 1
+
+
+def test_event_handlers_batched():
+    renderer = PygfxRenderer()
+
+    events = []
+
+    def handler(event):
+        events.append(event.type)
+
+    def other(event):
+        events.append(f"other {event.type}")
+
+    obj = gfx.Scene()
+    renderer.add_event_listeners(
+        obj, {"click": handler, "pointer_down": handler, "wheel": other}
+    )
+
+    Event = namedtuple("Event", ["type", "cancelled"], defaults=[False])
+    for event_type in ["click", "pointer_down", "wheel"]:
+        obj.handle_event(Event(event_type))
+
+    assert events == ["click", "pointer_down", "other wheel"]
+
+    renderer.remove_event_listeners(obj, {"click": handler, "wheel": other})
+    for event_type in ["click", "pointer_down", "wheel"]:
+        obj.handle_event(Event(event_type))
+
+    assert events == ["click", "pointer_down", "other wheel", "pointer_down"]
@@ -1,9 +1,12 @@
 from weakref import ref
 
 from observ import reactive
+import pytest
 
 from collagraph import Collagraph, create_element as h, EventLoopType
+from collagraph.collagraph import apply_op, compare, create_ops
 from collagraph.renderers import Renderer
+from collagraph.types import OpType
 
 
 class CustomElement:
@@ -123,3 +126,52 @@ def test_reconcile_by_key():
                 pass
 
         assert len(after) == len(items.children), name
+
+
+def test_reconcile_unhashable_key():
+    def Items(props):
+        return h("items", {}, *[h("item", {"key": item}) for item in props["items"]])
+
+    gui = Collagraph(
+        renderer=CustomElementRenderer(), event_loop_type=EventLoopType.SYNC
+    )
+    container = CustomElement()
+    container.type = "root"
+    container.children = []
+
+    with pytest.raises(TypeError, match="key of element 'item' should be hashable"):
+        gui.render(h(Items, {"items": [[1], [2]]}), container)
+
+
+def test_compare_matches_first_unmatched_by_key():
+    def key(item):
+        return item[0]
+
+    old = [("a", 0), (None, 1), ("b", 2), (None, 3), ("c", 4)]
+    new = [("b",), (None,), ("d",), ("a",), (None,), (None,)]
+
+    matches, removals = compare(new, old, key=key)
+
+    assert matches == [("b", 2), (None, 1), None, ("a", 0), (None, 3), None]
+    assert removals == [("c", 4)]
+
+
+def test_create_ops_minimal_moves():
+    states = [
+        (["a", "b", "c"], ["c", "a", "b"], 1),  # shift right
+        (["a", "b", "c"], ["b", "c", "a"], 1),  # shift left
+        (["a", "b", "c", "d"], ["d", "c", "b", "a"], 3),  # reverse order
+        (["a", "b", "c", "d"], ["a", "c", "b", "d"], 1),  # swap in middle
+        (["a", "b", "c"], ["a", "b", "c", "d"], 0),  # add last
+        (["a", "b", "c"], ["b", "c"], 0),  # remove first
+        (["a", "b", "c", "d"], ["e", "f"], 0),  # replace completely
+    ]
+
+    for before, after, moves in states:
+        ops = create_ops(before, after)
+        assert len([op for op in ops if op["op"] is OpType.MOVE]) == moves
+
+        wip = before.copy()
+        for op in ops:
+            apply_op(op, wip)
+        assert wip == after